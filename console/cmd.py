@@ -1,8 +1,15 @@
 """Asynchronous command line utility."""
 import asyncio
+import os
 import re
 import sys
 
+# Text between double quotes, e.g. "Chip Kelly"
+_QUOTED_RE = re.compile(r'"[^"]*"')
+
+# Reader of stdin, created on the first call of ainput()
+_stdin_reader = None
+
 
 def get_params(cmd):
     """Decode parameters.
@@ -10,38 +17,35 @@ def get_params(cmd):
     :param cmd:
     :return:
     """
-    # Get the text between quote first
-    quoted = re.compile('"[^"]*"')
-
-    # Get all the sentence between quote " "
-    cmd_list = quoted.findall(cmd)
+    if '"' not in cmd:
+        # Nothing quoted, split the string by whitespace
+        return cmd.split()
 
     quote_dict = {}
 
-    # Replace the original text by -. For example "Chip Kelly" -> "Chip-Kelley"
-    for q in cmd_list:
-        q1 = q.replace(" ", "-")
-        cmd = cmd.replace(q, q1)
-
+    def _dash_quoted(match):
+        # Replace the original text by -. For example "Chip Kelly" -> Chip-Kelly
         # Keep a record here to replace later - but remove the quote "
-        # -> become string instead of class
-        quote_dict[q1.replace('"', '')] = q.replace('"', '')
+        original = match.group(0)[1:-1]
+        dashed = original.replace(" ", "-")
+        quote_dict[dashed] = original
+        return dashed
+
+    # Replace all the sentences between quote " " in one pass
+    cmd = _QUOTED_RE.sub(_dash_quoted, cmd)
 
-    # Remove the " signed before split the text
+    # Remove a remaining unbalanced " before split the text
     cmd = cmd.replace('"', '')
 
-    # The first command: ' '.join(cmd.split()) will remove the double space first
-    # ls   hello => ls hello
-    # The second part of the command .split(' ') to split the string by space
-    # ls hello => ['ls', 'hello']
-    all_commands = ' '.join(cmd.split()).split(' ')
+    # Split the string by whitespace, runs of spaces are collapsed
+    # ls   hello => ['ls', 'hello']
+    all_commands = cmd.split()
 
     all_cmds = []
     for cm in all_commands:
 
         # Replace to the original string with " " space instead of "-"
-        if cm in quote_dict.keys():
-            print(quote_dict[cm])
+        if cm in quote_dict:
             all_cmds.append(quote_dict[cm])
         else:
             all_cmds.append(cm)
@@ -49,9 +53,34 @@ def get_params(cmd):
     return all_cmds
 
 
+async def _open_stdin_reader():
+    """Return a StreamReader reading stdin on the event loop, or None if not supported.
+
+    A terminal is not read on the event loop: the pipe reader switches stdin to
+    non-blocking mode, and a terminal shares this mode with stdout and the shell.
+    """
+    global _stdin_reader
+
+    if _stdin_reader is None and os.name != 'nt' and not sys.stdin.isatty():
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        try:
+            await loop.connect_read_pipe(
+                lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        except (ValueError, OSError, NotImplementedError):
+            # stdin is a regular file or the loop can not watch it
+            return None
+        _stdin_reader = reader
+
+    return _stdin_reader
+
+
 async def ainput() -> str:
     """Asynchronous input."""
-    # await asyncio.get_event_loop().run_in_executor(
-    #        None, lambda s=string: sys.stdout.write(s+' '))
-    return await asyncio.get_event_loop().run_in_executor(
-        None, sys.stdin.readline)
+    reader = await _open_stdin_reader()
+    if reader is not None:
+        return (await reader.readline()).decode()
+
+    # Terminal, or Windows event loops that do not support pipes on stdin
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, sys.stdin.readline)
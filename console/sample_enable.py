@@ -1,4 +1,5 @@
 import asyncio
+import os
 import sys
 from masterflexserial.masterflexserial import MasterflexSerial
 
@@ -8,11 +9,19 @@ async def enable(port):
     serial_task = asyncio.create_task(pump.connect())
 
     async def pump_cmd():
-        await asyncio.sleep(1)
-        await pump.enable()
+        await pump.wait_connected()
+        if pump.connected:
+            await pump.enable()
 
     cmd_task = asyncio.create_task(pump_cmd())
     # Run both task at the same time
     await asyncio.gather(serial_task, cmd_task)
 
+if os.name != 'nt':
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
 asyncio.run(enable(sys.argv[1]))
\ No newline at end of file
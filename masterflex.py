@@ -3,7 +3,6 @@ import asyncio
 import os
 import signal
 import sys
-from sys import exit
 
 from masterflexserial.masterflexserial import MasterflexSerial
 from console import cmd
@@ -36,6 +35,35 @@ def cmd_help():
 
 PREFIX = "mflx# "
 
+_QUIT_CMDS = frozenset({'q', 'Q', 'quit', 'exit'})
+_HELP_CMDS = frozenset({'?', 'h', 'help'})
+
+# Commands without parameter: command -> (printed label, handler)
+_ONE_ARG_CMDS = {
+    'enable': (PREFIX + "Enable pump serial communication", lambda pump, args: pump.enable()),
+    'disable': (PREFIX + "Disable pump serial communication", lambda pump, args: pump.disable()),
+    'start': (PREFIX + "Start pump", lambda pump, args: pump.start()),
+    'stop': (PREFIX + "Stop pump", lambda pump, args: pump.stop()),
+    'status': (PREFIX + "Get the pump status", lambda pump, args: pump.status()),
+    'dir-cw': (PREFIX + "Set pump direction to 'clockwise'", lambda pump, args: pump.set_dir('cw')),
+    'dir-ccw': (PREFIX + "Set pump direction to 'counter-clockwise'", lambda pump, args: pump.set_dir('ccw')),
+    'reset-cumulative': (PREFIX + "Reset pump cumulative volume to zero", lambda pump, args: pump.reset_cumulative()),
+    'speedr': (PREFIX + "Get pump speed in RPM", lambda pump, args: pump.speed_rpm()),
+    'speedp': (PREFIX + "Get Pump speed in percentage", lambda pump, args: pump.speed_percent()),
+    'volume': (PREFIX + "Get Pump volume in current unit", lambda pump, args: pump.volume()),
+    'volume-rev': (PREFIX + "Get Pump volume in rev", lambda pump, args: pump.volume_rev()),
+    'unit-index': (PREFIX + "Get pump flow rate unit index", lambda pump, args: pump.unit_index()),
+}
+
+# Commands with one parameter: command -> (printed label, handler)
+# The label is formatted with the parameter
+_TWO_ARG_CMDS = {
+    'speedp': (PREFIX + "Set pump speed in percentage", lambda pump, args: pump.speed_percent(args[1])),
+    'id': (PREFIX + "Set the pump IPC Serial ID {}", lambda pump, args: pump.set_addr(args[1])),
+    'speedr': (PREFIX + "Set pump speed in RPM", lambda pump, args: pump.speed_rpm(args[1])),
+    'unit-index': (PREFIX + "Set pump flow rate unit index", lambda pump, args: pump.unit_index(args[1])),
+}
+
 
 async def console_cmd(pump: MasterflexSerial):
     """Run the loop to get input text.
@@ -43,109 +71,48 @@ async def console_cmd(pump: MasterflexSerial):
     pump: an instance of the MasterflexSerial class
 
     """
-    # Wait here for 1 second to wait for the Serial Comm to connect
-    await asyncio.sleep(1)
+    # Wait here for the Serial Comm to connect
+    await pump.wait_connected()
+    if not pump.connected:
+        print(f"Unable to connect to the pump on {pump.port}")
+        return
 
     print("Masterflex Pump Drive Command Line Tools")
 
     while True:
-        print(PREFIX, end='', flush=True)
+        sys.stdout.write(PREFIX)
+        sys.stdout.flush()
         x = await cmd.ainput()
         args = cmd.get_params(x)
         argument = ' '.join(map(str, args))
-        response = None
-
-        if len(args) == 1:
-
-            if args[0] == 'enable':
-                print(PREFIX + "Enable pump serial communication")
-                response = await pump.enable()
-
-            elif args[0] == 'disable':
-                print(PREFIX + "Disable pump serial communication")
-                response = await pump.disable()
-
-            elif args[0] == 'start':
-                print(PREFIX + "Start pump")
-                response = await pump.start()
-
-            elif args[0] == 'stop':
-                print(PREFIX + "Stop pump")
-                response = await pump.stop()
-
-            elif args[0] == 'status':
-                print(PREFIX + "Get the pump status")
-                response = await pump.status()
-
-            elif args[0] == 'dir-cw':
-                print(PREFIX + "Set pump direction to 'clockwise'")
-                response = await pump.set_dir('cw')
-
-            elif args[0] == 'dir-ccw':
-                print(PREFIX + "Set pump direction to 'counter-clockwise'")
-                response = await pump.set_dir('ccw')
-
-            elif args[0] == 'reset-cumulative':
-                print(PREFIX + "Reset pump cumulative volume to zero")
-                response = await pump.reset_cumulative()
-
-            elif args[0] == 'speedr':
-                print(PREFIX + "Get pump speed in RPM")
-                response = await pump.speed_rpm()
-
-            elif args[0] == 'speedp':
-                print(PREFIX + "Get Pump speed in percentage")
-                response = await pump.speed_percent()
-
-            elif args[0] == 'volume':
-                print(PREFIX + "Get Pump volume in current unit")
-                response = await pump.volume()
+        # Lines to print once the command is completed
+        out = []
 
-            elif args[0] == 'volume-rev':
-                print(PREFIX + "Get Pump volume in rev")
-                response = await pump.volume_rev()
+        if len(args) == 1 and args[0] in _QUIT_CMDS:
+            # Leave the loop to let main() complete
+            return
 
-            elif args[0] == 'unit-index':
-                print(PREFIX + "Get pump flow rate unit index")
-                response = await pump.unit_index()
-
-            elif args[0] in ['q', 'Q', 'quit', 'exit']:
-                try:
-                    exit(0)
-                except Exception as ex:
-                    print("Exit program with exception %s" % ex)
-
-            elif args[0] in ['?', 'h', 'help']:
-                cmd_help()
-
-            else:
-                print(PREFIX + args[0] + ": command is not supported")
-
-        elif len(args) == 2:
-            if args[0] == 'speedp':
-                print(PREFIX + "Set pump speed in percentage")
-                response = await pump.speed_percent(args[1])
-
-            elif args[0] == 'id':
-                print(PREFIX + "Set the pump IPC Serial ID " + args[1])
-                response = await pump.set_addr(args[1])
-
-            elif args[0] == 'speedr':
-                print(PREFIX + "Set pump speed in RPM")
-                response = await pump.speed_rpm(args[1])
-
-            elif args[0] == 'unit-index':
-                print(PREFIX + "Set pump flow rate unit index")
-                response = await pump.unit_index(args[1])
-
-            else:
-                print(PREFIX + argument + ": command is not supported")
+        if len(args) == 1 and args[0] in _HELP_CMDS:
+            cmd_help()
 
         else:
-            print(PREFIX + argument + ": command is not supported")
+            entry = None
+            if len(args) == 1:
+                entry = _ONE_ARG_CMDS.get(args[0])
+            elif len(args) == 2:
+                entry = _TWO_ARG_CMDS.get(args[0])
+
+            if entry is None:
+                out.append(f"{PREFIX}{argument}: command is not supported")
+            else:
+                label, handler = entry
+                out.append(label.format(*args[1:]) if len(args) == 2 else label)
+                response = await handler(pump, args)
+                if response is not None:
+                    out.append(str(response))
 
-        if response is not None:
-            print(response)
+        if out:
+            sys.stdout.write('\n'.join(out) + '\n')
 
 
 async def main(port="/dev/ttyUSB0"):
@@ -177,4 +144,12 @@ if __name__ == '__main__':
         print("Usage: python3 masterflex.py <serial_path>")
 
     else:
+        if os.name != 'nt':
+            # Use the faster libuv based event loop when it is available
+            try:
+                import uvloop
+                uvloop.install()
+            except ImportError:
+                pass
+
         asyncio.run(main(sys.argv[1]))
@@ -1,12 +1,14 @@
 """Masterflex Serial Communication."""
 
 import asyncio
-import json
+import collections
+import functools
 import logging
+import math
 import serial
 import serial_asyncio
 
-from masterflexserial.protocol import SerialProtocol, DIR
+from masterflexserial.protocol import SerialProtocol
 
 from masterflexserial.message import SentMessage
 from masterflexserial.message import SentMessageType
@@ -16,6 +18,141 @@ from masterflexserial.message import create_message
 
 logger = logging.getLogger(__name__)
 
+# Messages sent to the pump, shared by all the commands
+_ENABLE = SentMessage(SentMessageId.ENABLE, SentMessageType.RESP_SET)
+_STATUS = SentMessage(SentMessageId.STATUS, SentMessageType.RESP_GET)
+_START = SentMessage(SentMessageId.START, SentMessageType.RESP_SET)
+_STOP = SentMessage(SentMessageId.STOP, SentMessageType.RESP_SET)
+_SPEEDP_GET = SentMessage(SentMessageId.SPEEDP, SentMessageType.RESP_GET)
+_SPEEDP_SET = SentMessage(SentMessageId.SPEEDP, SentMessageType.RESP_SET)
+_DIR_CW = SentMessage(SentMessageId.DIR_CW, SentMessageType.RESP_SET)
+_DIR_CCW = SentMessage(SentMessageId.DIR_CCW, SentMessageType.RESP_SET)
+_RESET_CUMULATIVE = SentMessage(SentMessageId.RESET_CUMULATIVE, SentMessageType.RESP_SET)
+_SET_ADDR = SentMessage(SentMessageId.SET_ADDR, SentMessageType.RESP_SET, "id")
+_SPEEDR_GET = SentMessage(SentMessageId.SPEEDR, SentMessageType.RESP_GET)
+_SPEEDR_SET = SentMessage(SentMessageId.SPEEDR, SentMessageType.RESP_SET)
+_VOLUME = SentMessage(SentMessageId.VOLUME, SentMessageType.RESP_GET)
+_VOLUME_REV = SentMessage(SentMessageId.VOLUME_REV, SentMessageType.RESP_GET)
+_UNIT_INDEX_GET = SentMessage(SentMessageId.UNIT_INDEX, SentMessageType.RESP_GET)
+_UNIT_INDEX_SET = SentMessage(SentMessageId.UNIT_INDEX, SentMessageType.RESP_SET)
+
+# Pump direction -> message to set it
+_DIR_MSG = {
+    "cw": _DIR_CW,
+    "ccw": _DIR_CCW
+}
+
+# Messages with a fixed payload: (message, payload)
+_FIXED_MESSAGES = (
+    (_ENABLE, "1"),
+    (_ENABLE, "0"),
+    (_STATUS, None),
+    (_START, None),
+    (_STOP, None),
+    (_SPEEDP_GET, None),
+    (_DIR_CW, None),
+    (_DIR_CCW, None),
+    (_RESET_CUMULATIVE, None),
+    (_SPEEDR_GET, None),
+    (_VOLUME, None),
+    (_VOLUME_REV, None),
+    (_UNIT_INDEX_GET, None)
+)
+
+# Responses to invalid parameters, copied on return so the callers can modify their response
+_ERR_SPEEDP_RANGE = {"result": "Invalid", "error": "Speed in percent must be from 0 to 100"}
+_ERR_SPEEDP_NAN = {"result": "Invalid", "error": "Not a number. Speed in percent must be from 0 to 100"}
+_ERR_DIR = {"result": "Invalid", "error": "Invalid param. Valid inputs: 'cw' or 'ccw'"}
+_ERR_ADDR_RANGE = {"result": "Invalid", "error": "Address must be between 1 and 8"}
+_ERR_ADDR_NAN = {"result": "Invalid", "error": "Not a valid number. Address must be integer between 1 and 8"}
+_ERR_SPEEDR_RANGE = {"result": "Invalid", "error": "Value out of range. Pumps range in RPM: 0 to 9999.99"}
+_ERR_SPEEDR_NAN = {"result": "Invalid", "error": "Invalid param. Valid inputs: int or float"}
+_ERR_UNIT_INDEX_RANGE = {"result": "Invalid", "error": "Value out of range. Pumps flow unit index range: 0 to 32"}
+_ERR_UNIT_INDEX_NAN = {"result": "Invalid", "error": "Invalid param. Valid inputs: integer"}
+
+# Encoded messages with a fixed payload for every pump address:
+# address -> {(message, payload): encoded message}
+_FRAMES = {
+    addr: {
+        (msg, payload): create_message(msg, payload, addr).encode()
+        for msg, payload in _FIXED_MESSAGES
+    }
+    for addr in ("1", "2", "3", "4", "5", "6", "7", "8")
+}
+
+
+def _to_int(value):
+    """Convert a value to int without raising.
+
+    int values are returned as is, integral floats and the values accepted by int() are converted.
+
+    Returns:
+        - the integer value, or None if the value is not an integer number.
+    """
+    if type(value) is int:
+        return value
+
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else None
+
+    text = str(value).strip()
+    digits = text[1:] if text[:1] in ('-', '+') else text
+    if digits.isdecimal():
+        return int(text)
+
+    try:
+        # Less common forms, e.g. True or 1_0
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value):
+    """Convert a value to a finite number without raising.
+
+    int and float values are returned as is, other values are converted to float.
+
+    Returns:
+        - the number, or None if the value is not a finite number.
+    """
+    if not isinstance(value, (int, float)):
+        try:
+            value = float(value)
+        except ValueError:
+            return None
+
+    return value if math.isfinite(value) else None
+
+
+# Numeric parameter of a SET message:
+#   msg: message to send to the pump
+#   to_number: convert the parameter to a number, None if it is not valid
+#   in_range: check the range of the number
+#   scale, width: the payload is round(number * scale) padded with 0 to width digits
+#   err_nan, err_range: responses to an invalid parameter
+_NumericParam = collections.namedtuple(
+    '_NumericParam', ('msg', 'to_number', 'in_range', 'scale', 'width', 'err_nan', 'err_range'))
+
+_SPEEDP_PARAM = _NumericParam(
+    _SPEEDP_SET, _to_float, lambda speed: 0 <= speed <= 100.0, 10, 5,
+    _ERR_SPEEDP_NAN, _ERR_SPEEDP_RANGE)
+# Min and max to be modified in the future once pumps min and max can obtained.
+_SPEEDR_PARAM = _NumericParam(
+    _SPEEDR_SET, _to_float, lambda speed: 0 < speed <= 9999.99, 100, 6,
+    _ERR_SPEEDR_NAN, _ERR_SPEEDR_RANGE)
+_UNIT_INDEX_PARAM = _NumericParam(
+    _UNIT_INDEX_SET, _to_int, lambda index: 0 < index <= 32, 1, 2,
+    _ERR_UNIT_INDEX_NAN, _ERR_UNIT_INDEX_RANGE)
+
+
+@functools.lru_cache(maxsize=128)
+def _encode_message(msg: SentMessage, payload: str, addr: str) -> bytes:
+    """Create the serial message to send to the pump, encoded in bytes.
+
+    The most recent messages are cached since the same commands are sent repeatedly.
+    """
+    return create_message(msg, payload, addr).encode()
+
 
 class MasterflexSerial:
     """Masterflex Serial CommunicationClient.
@@ -23,7 +160,11 @@ class MasterflexSerial:
     Manages connection and auto-reconnection to the serial resource.
     """
 
-    def __init__(self, port: str, _addr: str = '1', baud: float = 115200):
+    __slots__ = ('port', '_addr', 'baud_rate', '_low_latency', 'response_timeout', '_pending', '_response_timer',
+                 '_connect_event', '_connect_task', '_protocol', '_frames')
+
+    def __init__(self, port: str, _addr: str = '1', baud: float = 115200, low_latency: bool = True,
+                 response_timeout: float = 2.0):
         """Initialize the Serial comm client.
 
         Args:
@@ -33,36 +174,55 @@ class MasterflexSerial:
                 on Windows     : COM1
             baud: serial comm baud rate default at 115200 bps
             _addr: serial address of the pump - default 1
+            low_latency: enable the low latency mode of the serial port when it is supported
+            response_timeout: seconds to wait for the pump to answer a message - default 2
         """
 
         self.port = port
-        self._addr = "1"
         # Masterflex pump serial address support from 1 to 8 in text format
-        if int(_addr) > 0 and int(_addr) < 9:
-            self._addr = _addr
+        addr = int(_addr)
+        self._addr = str(addr) if 1 <= addr <= 8 else "1"
 
         self.baud_rate = baud
-        self._recv_message = None
-        self._data_event = asyncio.Event()
+        self._low_latency = low_latency
+        self.response_timeout = response_timeout
+        # Messages waiting to be sent or answered by the pump, in order:
+        # (message, encoded message, future of the response)
+        self._pending = collections.deque()
+        # Timer of the response to the first message of the queue
+        self._response_timer = None
+        # Set once a connection attempt to the serial port is completed
+        self._connect_event = asyncio.Event()
 
-        # Get event loop in main thread
-        self._loop = asyncio.get_event_loop()
         self._connect_task = None
         self._protocol = None
-        self.logger = logging.getLogger(__name__)
+        # Encoded messages with a fixed payload for the pump address
+        self._frames = _FRAMES[self._addr]
 
     async def connect(self):
         """Connect to the serial port."""
 
         try:
             self._connect_task = await serial_asyncio.create_serial_connection(
-                self._loop,
+                asyncio.get_running_loop(),
                 self._protocol_factory,
                 self.port,
                 self.baud_rate)
 
         except serial.SerialException:
-            self.logger.error('Unable to connect to: ', self.port)
+            logger.error('Unable to connect to: %s', self.port)
+
+        finally:
+            # The connection attempt is completed, even if it failed or was cancelled
+            self._connect_event.set()
+
+    async def wait_connected(self):
+        """Wait until the connection attempt to the serial port is completed.
+
+        Check the connected property afterwards, the connection attempt may have failed.
+        """
+
+        await self._connect_event.wait()
 
     def disconnect(self):
         """Disconnect from the serial comm transport."""
@@ -72,15 +232,23 @@ class MasterflexSerial:
             self._connect_task.cancel()
             self._connect_task = None
 
-        if self._protocol and self._protocol.transport:
+        protocol = self._protocol
+        if protocol and protocol.transport:
             # Close the serial transport.
-            self.logger.debug('Close Serial connection to %s', self.port)
-            self.protocol.transport.close()
+            logger.debug('Close Serial connection to %s', self.port)
+            protocol.transport.close()
 
     def _connection_lost(self):
         """Handle the connection lost."""
         self._protocol = None
-        self.logger.error("Connection loss")
+        self._cancel_response_timer()
+        # The pump will not answer the messages in the queue anymore,
+        # answer them with an error so the callers are not cancelled
+        while self._pending:
+            msg, _, resp_fut = self._pending.popleft()
+            if not resp_fut.done():
+                resp_fut.set_result(ReceivedMessage(msg, {"result": "Invalid", "error": "Connection lost"}))
+        logger.error("Connection loss")
 
     def _connection_made(self,
                          protocol_connection: SerialProtocol):
@@ -89,8 +257,16 @@ class MasterflexSerial:
         Args:
             protocol_connection: use SerialProtocol to make connection.
         """
-        self.logger.info("connection to serial port", self.port, "is made")
+        logger.info("connection to serial port %s is made", self.port)
+        if self._low_latency:
+            try:
+                # Reduce the latency timer of USB serial adapters, Linux only
+                protocol_connection.transport.serial.set_low_latency_mode(True)
+            except (AttributeError, ValueError) as ex:
+                logger.debug("Low latency mode is not available on %s: %s", self.port, ex)
+
         self._protocol = protocol_connection
+        self._connect_event.set()
 
     def _protocol_factory(self):
         """Create a protocol for the connection."""
@@ -103,10 +279,8 @@ class MasterflexSerial:
     @property
     def connected(self):
         """Get the current serial connected state."""
-        if self._protocol is not None and self._protocol.transport is not None:
-            return True
-        else:
-            return False
+        protocol = self._protocol
+        return protocol is not None and protocol.transport is not None
 
     @property
     def protocol(self):
@@ -121,19 +295,128 @@ class MasterflexSerial:
     async def _send_message(self, msg: SentMessage, payload: str, addr: str = 1):
         """Write data to the serial port if it is open and connected.
 
+        The messages are queued, so the pump answers them one at a time in order.
+
         Args:
             msg: serial message to send to the pump and its type
             payload: message payload
             addr: address of the pump - default 1
         """
-        if self.connected:
-            self._data_event.clear()
-            self._recv_message = None
-            self._protocol.set_last_message(msg)
-            data = create_message(msg, payload, addr)
-            self._protocol.transport.write(data.encode())
-            await self._data_event.wait()
-            return self._recv_message.data
+        protocol = self._protocol
+        if protocol is None or protocol.transport is None:
+            return None
+
+        resp_fut = asyncio.get_running_loop().create_future()
+        data = self._frames.get((msg, payload)) if addr == self._addr else None
+        if data is None:
+            data = _encode_message(msg, payload, addr)
+
+        # Drop the message from the queue if the caller stops waiting for the response
+        resp_fut.add_done_callback(self._response_done)
+
+        pending = self._pending
+        pending.append((msg, data, resp_fut))
+        if len(pending) == 1:
+            # Nothing else is waiting for the pump, send it now
+            self._write_pending()
+
+        recv_msg = await resp_fut
+        return recv_msg.data
+
+    async def _numeric_set(self, param: _NumericParam, value) -> dict:
+        """Validate a numeric parameter and send its SET message to the pump.
+
+        Args:
+            param: the numeric parameter to set
+            value: value of the parameter
+
+        Returns:
+            - the response of the pump, or the error response for an invalid value.
+        """
+        number = param.to_number(value)
+        if number is None:
+            return dict(param.err_nan)
+
+        if not param.in_range(number):
+            return dict(param.err_range)
+
+        # Conversion to pass in correct payload value
+        payload = str(round(number * param.scale)).zfill(param.width)
+        return await self._send_message(param.msg, payload, self.addr)
+
+    async def send_many(self, messages) -> list:
+        """Send several messages to the pump and wait for all the responses.
+
+        Each message is written as soon as the previous one is answered.
+
+        Args:
+            messages: list of (message, payload) to send to the pump
+
+        Returns:
+            - the responses of the pump, in the order of the messages.
+        """
+
+        return await asyncio.gather(
+            *(self._send_message(msg, payload, self.addr) for msg, payload in messages))
+
+    def _write_pending(self):
+        """Write the first message of the queue to the pump, and wait for its response."""
+        msg, data, _ = self._pending[0]
+        protocol = self._protocol
+        protocol.set_last_message(msg)
+        protocol.transport.write(data)
+        self._cancel_response_timer()
+        self._response_timer = asyncio.get_running_loop().call_later(
+            self.response_timeout, self._response_timeout)
+
+    def _cancel_response_timer(self):
+        """Stop waiting for the response to the first message of the queue."""
+        if self._response_timer is not None:
+            self._response_timer.cancel()
+            self._response_timer = None
+
+    def _write_next(self):
+        """Write the next message of the queue once the first one is answered or dropped."""
+        self._cancel_response_timer()
+        if self._pending and self.connected:
+            self._write_pending()
+
+    def _response_timeout(self):
+        """Answer the first message of the queue with an error, the pump did not respond in time.
+
+        The next message is sent, so one lost response does not block the messages behind it.
+        """
+        self._response_timer = None
+        if not self._pending:
+            return
+
+        msg, _, resp_fut = self._pending.popleft()
+        logger.warning("No response from the pump to: %s", msg)
+        if not resp_fut.done():
+            resp_fut.set_result(ReceivedMessage(msg, {"result": "Invalid", "error": "No response from the pump"}))
+
+        protocol = self._protocol
+        if protocol is not None:
+            # A late response must not be taken for the response to the next message
+            protocol.set_last_message(None)
+        self._write_next()
+
+    def _response_done(self, resp_fut: asyncio.Future):
+        """Remove a cancelled response from the queue.
+
+        If the pump was still expected to answer it, the next message is sent,
+        so one missing response does not block the messages behind it.
+        """
+        if not resp_fut.cancelled():
+            return
+
+        pending = self._pending
+        for index, (_, _, fut) in enumerate(pending):
+            if fut is resp_fut:
+                del pending[index]
+                if index == 0:
+                    self._write_next()
+                return
 
     def _received_response_message(self, recv_msg: ReceivedMessage):
         """Is called from a lower layer when a msg is decoded successfully.
@@ -142,10 +425,17 @@ class MasterflexSerial:
             recv_msg: received message from the pump
         """
 
-        self._recv_message = recv_msg
-        self._data_event.set()
+        if not self._pending:
+            return
+
+        _, _, resp_fut = self._pending.popleft()
+        if not resp_fut.done():
+            resp_fut.set_result(recv_msg)
+
+        # Send the next message straight away from the response callback
+        self._write_next()
 
-    async def enable(self) -> json:
+    async def enable(self) -> dict:
         """Enable serial communication mode on the pump.
 
         This message needs to be sent first before the pump can take serial command except
@@ -157,10 +447,10 @@ class MasterflexSerial:
         """
 
         response = await self._send_message(
-            SentMessage(SentMessageId.ENABLE, SentMessageType.RESP_SET), "1", self.addr)
+            _ENABLE, "1", self.addr)
         return response
 
-    async def disable(self) -> json:
+    async def disable(self) -> dict:
         """Disable serial communication mode on the pump.
 
         Returns:
@@ -169,9 +459,9 @@ class MasterflexSerial:
         """
 
         return await self._send_message(
-            SentMessage(SentMessageId.ENABLE, SentMessageType.RESP_SET), "0", self.addr)
+            _ENABLE, "0", self.addr)
 
-    async def status(self) -> json:
+    async def status(self) -> dict:
         """Get the pump status.
 
         Returns:
@@ -187,9 +477,9 @@ class MasterflexSerial:
         """
 
         return await self._send_message(
-            SentMessage(SentMessageId.STATUS, SentMessageType.RESP_GET), None, self.addr)
+            _STATUS, None, self.addr)
 
-    async def start(self) -> json:
+    async def start(self) -> dict:
         """Start the pump.
 
         Returns:
@@ -199,9 +489,9 @@ class MasterflexSerial:
         """
 
         return await self._send_message(
-            SentMessage(SentMessageId.START, SentMessageType.RESP_SET), None, self.addr)
+            _START, None, self.addr)
 
-    async def stop(self) -> json:
+    async def stop(self) -> dict:
         """Stop the pump.
 
         Returns:
@@ -211,9 +501,9 @@ class MasterflexSerial:
         """
 
         return await self._send_message(
-            SentMessage(SentMessageId.STOP, SentMessageType.RESP_SET), None, self.addr)
+            _STOP, None, self.addr)
 
-    async def speed_percent(self, speed: float = None) -> json:
+    async def speed_percent(self, speed: float = None) -> dict:
         """Set/Get the pump speed in percentage.
 
         Args:
@@ -233,22 +523,11 @@ class MasterflexSerial:
         """
         if (speed is None):
             return await self._send_message(
-                SentMessage(SentMessageId.SPEEDP, SentMessageType.RESP_GET), None, self.addr)
+                _SPEEDP_GET, None, self.addr)
         else:
-            try:
-                speed = float(speed)
-                if 0 <= speed <= 100.0:
-                    speed_str = "{:05}".format(round(speed * 10))
-                    return await self._send_message(
-                        SentMessage(SentMessageId.SPEEDP, SentMessageType.RESP_SET), speed_str, self.addr)
-                else:
-                    return {"result": "Invalid",
-                            "error": "Speed in percent must be from 0 to 100"}
-            except ValueError:
-                return {"result": "Invalid",
-                        "error": "Not a number. Speed in percent must be from 0 to 100"}
-
-    async def set_dir(self, dir: None) -> json:
+            return await self._numeric_set(_SPEEDP_PARAM, speed)
+
+    async def set_dir(self, dir: None) -> dict:
         """Set pumps direction.
 
         Args:
@@ -261,19 +540,13 @@ class MasterflexSerial:
               for invalid direction value.
         """
 
-        if dir not in DIR.values():
-            return {"result": "Invalid",
-                    "error": "Invalid param. Valid inputs: 'cw' or 'ccw'"}
+        dir_msg = _DIR_MSG.get(dir) if isinstance(dir, str) else None
+        if dir_msg is None:
+            return dict(_ERR_DIR)
 
-        else:
-            if dir == 'cw':
-                return await self._send_message(
-                    SentMessage(SentMessageId.DIR_CW, SentMessageType.RESP_SET), None, self.addr)
-            else:
-                return await self._send_message(
-                    SentMessage(SentMessageId.DIR_CCW, SentMessageType.RESP_SET), None, self.addr)
-
-    async def reset_cumulative(self) -> json:
+        return await self._send_message(dir_msg, None, self.addr)
+
+    async def reset_cumulative(self) -> dict:
         """Reset cumulative volume in current unit set to zero-value.
 
         Returns:
@@ -283,9 +556,9 @@ class MasterflexSerial:
         """
 
         return await self._send_message(
-            SentMessage(SentMessageId.RESET_CUMULATIVE, SentMessageType.RESP_SET), None, self.addr)
+            _RESET_CUMULATIVE, None, self.addr)
 
-    async def set_addr(self, pump_addr) -> json:
+    async def set_addr(self, pump_addr) -> dict:
         """Set pump address.
 
         Args:
@@ -299,19 +572,19 @@ class MasterflexSerial:
               for decimal and not number value.
         """
 
-        try:
-            if 1 <= int(pump_addr) <= 8:
-                self._addr = pump_addr
-                return await self._send_message(
-                    SentMessage(SentMessageId.SET_ADDR, SentMessageType.RESP_SET, "id"), pump_addr, self.addr)
-            else:
-                return {"result": "Invalid",
-                        "error": "Address must be between 1 and 8"}
-        except ValueError:
-            return {"result": "Invalid",
-                    "error": "Not a valid number. Address must be integer between 1 and 8"}
+        addr = _to_int(pump_addr)
+        if addr is None:
+            return dict(_ERR_ADDR_NAN)
 
-    async def speed_rpm(self, speed: float = None) -> json:
+        if not 1 <= addr <= 8:
+            return dict(_ERR_ADDR_RANGE)
+
+        self._addr = str(addr)
+        self._frames = _FRAMES[self._addr]
+        return await self._send_message(
+            _SET_ADDR, self._addr, self.addr)
+
+    async def speed_rpm(self, speed: float = None) -> dict:
         """Set/Get the pump speed in rpm.
 
         Args:
@@ -332,28 +605,12 @@ class MasterflexSerial:
 
         if speed is None:
             return await self._send_message(
-                SentMessage(SentMessageId.SPEEDR, SentMessageType.RESP_GET), None, self.addr)
+                _SPEEDR_GET, None, self.addr)
 
         else:
-            try:
-                speed = float(speed)
+            return await self._numeric_set(_SPEEDR_PARAM, speed)
 
-                # Min and max to be modified in the future once pumps min and max can obtained.
-                if 0 < speed <= 9999.99:
-                    # Conversion to pass in correct payload value
-                    payload = "{:06}".format(round(speed * 100))
-
-                    return await self._send_message(
-                        SentMessage(SentMessageId.SPEEDR, SentMessageType.RESP_SET), payload, self.addr)
-                else:
-                    return {"result": "Invalid",
-                            "error": "Value out of range. Pumps range in RPM: 0 to 9999.99"}
-
-            except ValueError:
-                return {"result": "Invalid",
-                        "error": "Invalid param. Valid inputs: int or float"}
-
-    async def volume(self) -> json:
+    async def volume(self) -> dict:
         """Get the pump volume in current unit set.
 
         Returns:
@@ -366,9 +623,9 @@ class MasterflexSerial:
         """
 
         return await self._send_message(
-            SentMessage(SentMessageId.VOLUME, SentMessageType.RESP_GET), None, self.addr)
+            _VOLUME, None, self.addr)
 
-    async def volume_rev(self) -> json:
+    async def volume_rev(self) -> dict:
         """Get the pump volume in rev.
 
         Returns:
@@ -381,9 +638,9 @@ class MasterflexSerial:
         """
 
         return await self._send_message(
-            SentMessage(SentMessageId.VOLUME_REV, SentMessageType.RESP_GET), None, self.addr)
+            _VOLUME_REV, None, self.addr)
 
-    async def unit_index(self, index: int = None) -> json:
+    async def unit_index(self, index: int = None) -> dict:
         """Set/Get the pump flow unit index.
 
         Args:
@@ -403,22 +660,7 @@ class MasterflexSerial:
 
         if index is None:
             return await self._send_message(
-                SentMessage(SentMessageId.UNIT_INDEX, SentMessageType.RESP_GET), None, self.addr)
+                _UNIT_INDEX_GET, None, self.addr)
 
         else:
-            try:
-                index = int(index)
-                # Min and max to be modified in the future once pumps min and max can obtained.
-                if 0 < index <= 32:
-                    # Conversion to pass in correct payload value
-                    payload = "{:02}".format(index)
-
-                    return await self._send_message(
-                        SentMessage(SentMessageId.UNIT_INDEX, SentMessageType.RESP_SET), payload, self.addr)
-                else:
-                    return {"result": "Invalid",
-                            "error": "Value out of range. Pumps flow unit index range: 0 to 32"}
-
-            except ValueError:
-                return {"result": "Invalid",
-                        "error": "Invalid param. Valid inputs: integer"}
+            return await self._numeric_set(_UNIT_INDEX_PARAM, index)
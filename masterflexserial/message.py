@@ -45,6 +45,8 @@ class SentMessageType(enum.Enum):
 class SentMessage:
     """Serial message to send to the pump and its type."""
 
+    __slots__ = ('id', 'msg_type', 'name')
+
     def __init__(self, id: SentMessageId, msg_type: SentMessageType, name: str = ""):
         """Create a serial message."""
         self.id = id
@@ -84,6 +86,8 @@ class ReceivedMessageId(enum.Enum):
 class ReceivedMessage:
     """Format of a received message from the pump."""
 
+    __slots__ = ('success', 'sent_msg', 'data')
+
     def __init__(self, sent_msg: SentMessage, data: json = None):
         """Create a message that is sent back from the pump."""
 
@@ -119,7 +123,8 @@ def create_message(msg: SentMessage, payload: str, addr: str = '1'):
     payload: message payload
     addr: address of the pump - default 1
     """
-    if msg.id == SentMessageId.SET_ADDR:
-        return str(SentMessageId.SET_ADDR.value) + str(payload) + chr(13)
+    msg_id = msg.id
+    if msg_id is SentMessageId.SET_ADDR:
+        return f"{msg_id.value}{payload}\r"
 
-    return str(addr) + str(msg.id.value) + xstr(payload) + chr(13)
+    return f"{addr}{msg_id.value}{xstr(payload)}\r"
@@ -5,6 +5,7 @@ SerialProtocol: Response to the serial message and call the Decoder class.
 """
 import asyncio
 import logging
+import re
 
 from masterflexserial.message import SentMessageType, SentMessage, ReceivedMessageId, ReceivedMessage, SentMessageId
 
@@ -21,6 +22,58 @@ DIR = {
     "1": "ccw"
 }
 
+# Responses to a SET message, copied for each decoded message so the callers can modify it
+RESP_OK = {"result": "OK"}
+RESP_INVALID = {"result": "Invalid"}
+RESP_NOT_IN_SERIAL_MODE = {"result": "Not in Serial Comms mode"}
+RESP_NOT_A_PUMP_MESSAGE = {"result": "Not a pump message"}
+
+# Decoding errors, copied on return like the response templates
+_ERR_STATUS_FORMAT = {"result": "invalid", "error": "Invalid data format"}
+_ERR_STATUS_ADDR = {"result": "invalid", "error": "Invalid serial address"}
+_ERR_STATUS_MOTOR = {"result": "invalid", "error": "Invalid motor status"}
+_ERR_STATUS_DIR = {"result": "invalid", "error": "Invalid pump direction"}
+_ERR_FORMAT = {"result": "Invalid", "error": "Invalid data format"}
+_ERR_PERCENTAGE = {"result": "Invalid", "error": "Invalid percentage value"}
+
+# Response characters from the pump, bound once instead of looking up the enum values per message
+_RESP_OK_CHAR = ReceivedMessageId.RESP_OK.value
+_RESP_NO_CHAR = ReceivedMessageId.RESP_NO.value
+_RESP_NOT_IN_SERIAL_MODE_CHAR = ReceivedMessageId.RESP_NOT_IN_SERIAL_MODE.value
+_RESP_NOT_IN_SERIAL_MODE_BYTES = _RESP_NOT_IN_SERIAL_MODE_CHAR.encode()
+
+# Responses to a SET message by their byte value: (success, data)
+_SET_RESPONSES = {
+    ord(_RESP_OK_CHAR): (True, RESP_OK),
+    ord(_RESP_NO_CHAR): (False, RESP_INVALID),
+    ord(_RESP_NOT_IN_SERIAL_MODE_CHAR): (False, RESP_NOT_IN_SERIAL_MODE),
+}
+
+# Decimal number sent by the pump e.g. 60.0 or -1
+_NUMBER = r'[-+]?(?:\d+\.?\d*|\.\d+)'
+_NUMBER_RE = re.compile(_NUMBER)
+
+# Integer number sent by the pump e.g. 03
+_INTEGER_RE = re.compile(r'[-+]?\d+')
+
+# Volume response: number and unit separated by one space e.g. 20993.466 mL
+_VOLUME_RE = re.compile(r'(' + _NUMBER + r') ([^\s\d]\S*)')
+
+# Decoded GET responses with a fixed set of keys, copied and filled in per response
+_SPEEDP_TEMPLATE = {"result": "data", "speed": None, "unit": "%"}
+_SPEEDR_TEMPLATE = {"result": "data", "speed": None, "unit": "rpm"}
+_VOLUME_REV_TEMPLATE = {"result": "data", "index": None, "unit": "rev"}
+_UNIT_INDEX_TEMPLATE = {"result": "data", "index": None}
+
+# End of a GET response: CR, LF or both
+_FRAME_END_RE = re.compile(rb'[\r\n]')
+
+# Serial addresses of a pump
+_STATUS_ADDRS = frozenset("12345678")
+
+# Status response: address,motor status,direction e.g. 1,0,1
+_STATUS_RE = re.compile(r'(\d+),([^,]*),([^,]*)')
+
 
 class Decoder():
     """Decode on a message sending back from the pump."""
@@ -32,6 +85,16 @@ class Decoder():
         # Notify the upper layer a message has been received
         self._resp_message = _resp_message
 
+        # Decoders of the GET responses by the sent message ID
+        self._get_decoders = {
+            SentMessageId.STATUS: self.decode_status,
+            SentMessageId.SPEEDR: self._decode_speedr,
+            SentMessageId.SPEEDP: self.decode_speedp,
+            SentMessageId.VOLUME: self.decode_volume,
+            SentMessageId.VOLUME_REV: self._decode_volume_rev,
+            SentMessageId.UNIT_INDEX: self._decode_unit_index,
+        }
+
     def set_last_message(self, last_msg: SentMessage):
         """Set the last message to sent to the pump."""
         self.last_msg = last_msg
@@ -57,33 +120,25 @@ class Decoder():
             - json - decoded status message.
         """
 
-        data = {"result": "invalid"}
-        fields = recv_data.split(',')
+        match = _STATUS_RE.fullmatch(recv_data)
 
-        if len(fields) != 3:
-            data["error"] = "Invalid data format"
-            return data
-        else:
-            if int(fields[0]) < 1 or int(fields[0]) > 8:
-                data["error"] = "Invalid serial address"
-                return data
-
-            motor_status = MOTOR_STATUS.get(fields[1])
-            if motor_status is None:
-                data["error"] = "Invalid motor status"
-                return data
-
-            direction = DIR.get(fields[2])
-            if direction is None:
-                data["error"] = "Invalid pump direction"
-                return data
-
-            return {
-                "result": "data",
-                "address": fields[0],
-                "motor_status": motor_status,
-                "direction": direction
-            }
+        if match is None:
+            return _ERR_STATUS_FORMAT.copy()
+
+        address, motor, direction = match.groups()
+        if address not in _STATUS_ADDRS:
+            return _ERR_STATUS_ADDR.copy()
+        if motor not in MOTOR_STATUS:
+            return _ERR_STATUS_MOTOR.copy()
+        if direction not in DIR:
+            return _ERR_STATUS_DIR.copy()
+
+        return {
+            "result": "data",
+            "address": address,
+            "motor_status": MOTOR_STATUS[motor],
+            "direction": DIR[direction]
+        }
 
     def decode_speedp(self, recv_data: str):
         """Decode the speedp message from the pump.
@@ -95,24 +150,18 @@ class Decoder():
             - json - decoded status message.
         """
 
-        data = {"result": "Invalid"}
-
-        try:
-            speed = float(recv_data)
-            result = int(speed)
-            # Check the percentage value
-            if result < 0.0 or result > 100.0:
-                data["error"] = "Invalid percentage value"
-                return data
-
-            return {
-                "result": "data",
-                "speed": speed,
-                "unit": "%"
-            }
-        except ValueError:
-            data["error"] = "Invalid data format"
-            return data
+        if _NUMBER_RE.fullmatch(recv_data) is None:
+            return _ERR_FORMAT.copy()
+
+        speed = float(recv_data)
+        result = int(speed)
+        # Check the percentage value
+        if result < 0.0 or result > 100.0:
+            return _ERR_PERCENTAGE.copy()
+
+        data = _SPEEDP_TEMPLATE.copy()
+        data["speed"] = speed
+        return data
 
     def decode_volume(self, recv_data: str):
         """Decode the volume message from the pump.
@@ -124,30 +173,49 @@ class Decoder():
             - json - decoded status message.
         """
 
-        data = {"result": "Invalid"}
+        match = _VOLUME_RE.fullmatch(recv_data)
+        if match is None:
+            return _ERR_FORMAT.copy()
+
+        return {
+            "result": "data",
+            "volume": float(match.group(1)),
+            "unit": match.group(2)
+        }
 
-        try:
-            numerical_value, unit = recv_data.split(' ')
-            numerical_value = float(numerical_value)
+    def _decode_speedr(self, recv_data: str):
+        """Decode the speedr message from the pump."""
+        if _NUMBER_RE.fullmatch(recv_data) is None:
+            return _ERR_FORMAT.copy()
 
-            if unit.isnumeric():
-                data["error"] = "Invalid data format"
-                return data
+        data = _SPEEDR_TEMPLATE.copy()
+        data["speed"] = float(recv_data)
+        return data
 
-            return {
-                "result": "data",
-                "volume": numerical_value,
-                "unit": unit
-            }
-        except ValueError:
-            data["error"] = "Invalid data format"
-            return data
+    def _decode_volume_rev(self, recv_data: str):
+        """Decode the volume_rev message from the pump."""
+        if _NUMBER_RE.fullmatch(recv_data) is None:
+            return _ERR_FORMAT.copy()
+
+        data = _VOLUME_REV_TEMPLATE.copy()
+        data["index"] = float(recv_data)
+        return data
+
+    def _decode_unit_index(self, recv_data: str):
+        """Decode the unit_index message from the pump."""
+        if _INTEGER_RE.fullmatch(recv_data) is None:
+            return _ERR_FORMAT.copy()
+
+        data = _UNIT_INDEX_TEMPLATE.copy()
+        data["index"] = int(recv_data)
+        return data
 
     def client_decode(self, str_data: str):
         """Decode the message sent from the pump.
 
         Args:
-            - str_data - data input in ASCII string format
+            - str_data - data input in ASCII string format, without
+            the surrounding whitespace and CR LF
 
              It's assume that the pump sends one message at once
             A SET message will be responded with one character:
@@ -167,63 +235,47 @@ class Decoder():
             is available. The _update_message()is called.
         """
 
-        str_data = str_data.decode('utf-8', 'ignore').strip()
+        if not str_data:
+            # Nothing to decode
+            return
 
         if self.last_msg is None:
             # There is no message waiting for the response
             # Pump must send the message by itself
-            raise Exception("Serial Communication - not expected any input")
+            logger.warning("Serial Communication - not expected any input: %s", str_data)
+            return
 
         recv_msg = ReceivedMessage(self.last_msg)
 
-        if self.last_msg.msg_type == SentMessageType.RESP_SET:
+        if self.last_msg.msg_type is SentMessageType.RESP_SET:
             # If it's SET command, the expected resp text is only 1 character
-            if str_data == ReceivedMessageId.RESP_OK.value:
+            if str_data == _RESP_OK_CHAR:
                 recv_msg.success = True
-                recv_msg.data["result"] = "OK"
+                recv_msg.data = RESP_OK.copy()
 
-            elif str_data == ReceivedMessageId.RESP_NO.value:
-                recv_msg.data["result"] = "Invalid"
+            elif str_data == _RESP_NO_CHAR:
+                recv_msg.data = RESP_INVALID.copy()
 
-            elif str_data == ReceivedMessageId.RESP_NOT_IN_SERIAL_MODE.value:
-                recv_msg.data["result"] = "Not in Serial Comms mode"
+            elif str_data == _RESP_NOT_IN_SERIAL_MODE_CHAR:
+                recv_msg.data = RESP_NOT_IN_SERIAL_MODE.copy()
 
             else:
-                recv_msg.data["result"] = "Not a pump message"
+                recv_msg.data = RESP_NOT_A_PUMP_MESSAGE.copy()
 
         else:
             recv_msg.data["result"] = str_data
 
-            if recv_msg.data['result'] == ReceivedMessageId.RESP_NOT_IN_SERIAL_MODE.value:
+            if recv_msg.data['result'] == _RESP_NOT_IN_SERIAL_MODE_CHAR:
                 recv_msg.data['result'] = "Not in Serial Comms mode"
 
             else:
-                if recv_msg.sent_msg.id == SentMessageId.STATUS:
-                    recv_msg.data = self.decode_status(str_data)
-
-                elif recv_msg.sent_msg.id == SentMessageId.SPEEDR:
-                    recv_msg.data = {"result": "data",
-                                     "speed": float(str_data),
-                                     "unit": "rpm"}
-
-                elif recv_msg.sent_msg.id == SentMessageId.SPEEDP:
-                    recv_msg.data = self.decode_speedp(str_data)
-
-                elif recv_msg.sent_msg.id == SentMessageId.VOLUME:
-                    recv_msg.data = self.decode_volume(str_data)
-
-                elif recv_msg.sent_msg.id == SentMessageId.VOLUME_REV:
-                    recv_msg.data = {"result": "data",
-                                     "index": float(str_data),
-                                     "unit": "rev"}
-
-                elif recv_msg.sent_msg.id == SentMessageId.UNIT_INDEX:
-                    recv_msg.data = {"result": "data",
-                                     "index": int(str_data)}
-
+                decode = self._get_decoders.get(recv_msg.sent_msg.id)
+                if decode is None:
+                    # Still answer the message, so the next one can be sent
+                    recv_msg.data = {"result": "Invalid",
+                                     "error": "Pump data is not supported"}
                 else:
-                    return {"result": "Invalid",
-                            "error": "Pump data is not supported"}
+                    recv_msg.data = decode(str_data)
 
         if self._update_message:
             self._update_message(recv_msg)
@@ -236,10 +288,21 @@ class SerialProtocol(asyncio.Protocol, Decoder):
         """Masterflex Serial asyncio protocol handler."""
         super(SerialProtocol, self).__init__(**kw)
         self._transport = None
-        self.buffer = ""
+        self.buffer = bytearray()
         self.connection_made_callback = _connection_made
         self.connection_lost_callback = _connection_lost
 
+    def set_last_message(self, last_msg: SentMessage):
+        """Set the last message to sent to the pump.
+
+        The bytes left in the buffer belong to an incomplete response to a previous message,
+        they are dropped so they are not decoded with the response to this one.
+        """
+        if self.buffer:
+            logger.debug("Serial Communication - incomplete input dropped: %s", bytes(self.buffer))
+            self.buffer.clear()
+        super().set_last_message(last_msg)
+
     def connection_made(self, transport):
         """Notification that a connection is made with the serial transport."""
         self._transport = transport
@@ -248,8 +311,45 @@ class SerialProtocol(asyncio.Protocol, Decoder):
             self.connection_made_callback(self)
 
     def data_received(self, str_data):
-        """When data first received from serial port, in text format."""
-        self.client_decode(str_data)
+        """When data first received from serial port, in text format.
+
+        A GET response may be received in several chunks, it is kept in the buffer
+        until its CR or LF is received.
+        """
+        self.buffer.extend(str_data)
+
+        if len(self.buffer) == 1 and self.last_msg is not None and \
+                self.last_msg.msg_type is SentMessageType.RESP_SET:
+            response = _SET_RESPONSES.get(self.buffer[0])
+            if response is not None:
+                # Known SET response, there is nothing to decode
+                self.buffer.clear()
+                recv_msg = ReceivedMessage(self.last_msg, response[1].copy())
+                recv_msg.success = response[0]
+                self._update_message(recv_msg)
+                return
+
+        if self.last_msg is None or self.last_msg.msg_type is SentMessageType.RESP_SET or \
+                self.buffer.strip() == _RESP_NOT_IN_SERIAL_MODE_BYTES:
+            # One character response without CR LF, or not expected input
+            frames = [bytes(self.buffer)]
+            self.buffer.clear()
+        else:
+            # Only the complete frames are taken out of the buffer, in one sweep
+            frames = []
+            pos = 0
+            match = _FRAME_END_RE.search(self.buffer)
+            while match is not None:
+                end = match.start()
+                frames.append(bytes(self.buffer[pos:end]))
+                pos = end + 1
+                match = _FRAME_END_RE.search(self.buffer, pos)
+            del self.buffer[:pos]
+
+        for frame in frames:
+            frame = frame.decode('utf-8', 'ignore').strip()
+            if frame:
+                self.client_decode(frame)
 
     def connection_lost(self, exc):
         """Handle connection loss."""
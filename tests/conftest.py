@@ -0,0 +1,11 @@
+"""Pytest configuration shared by the unit tests."""
+import asyncio
+import os
+
+if os.name != 'nt':
+    # Run the asyncio tests on the faster libuv based event loop when it is available
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
@@ -6,7 +6,8 @@ from console.cmd import get_params
 @pytest.mark.parametrize(
     "input, expected_text",
     [("""clean      up  abc """, "clean-up-abc"),
-     ("""clean "up"   abc """, "clean-up-abc")]
+     ("""clean "up"   abc """, "clean-up-abc"),
+     ("""clean "up  x" abc""", "clean-up  x-abc")]
 )
 def test_console_cmd(input, expected_text):
     """Make sure the message is parsed correctly."""
@@ -1,40 +1,115 @@
 """Unit tests related to MasterflexSerial main module."""
-import json
 import asyncio
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, Mock
 
 import pytest
+import serial
 import serial_asyncio
-from asynctest import mock
 
-from masterflexserial.masterflexserial import MasterflexSerial
+from masterflexserial.masterflexserial import MasterflexSerial, _FRAMES, _to_int
 from masterflexserial.message import SentMessage, SentMessageId, SentMessageType, ReceivedMessage
+from masterflexserial.protocol import SerialProtocol, RESP_OK, RESP_INVALID, RESP_NOT_IN_SERIAL_MODE, \
+    RESP_NOT_A_PUMP_MESSAGE
+
+pytestmark = pytest.mark.asyncio
+
+
+# Sent messages of the mocked responses, built once for all the test cases
+ENABLE_MSG = SentMessage(SentMessageId.ENABLE, SentMessageType.RESP_SET, "enable")
+DISABLE_MSG = SentMessage(SentMessageId.ENABLE, SentMessageType.RESP_SET, "disable")
+START_MSG = SentMessage(SentMessageId.START, SentMessageType.RESP_SET, "start")
+STOP_MSG = SentMessage(SentMessageId.STOP, SentMessageType.RESP_SET, "stop")
+STATUS_MSG = SentMessage(SentMessageId.STATUS, SentMessageType.RESP_GET, "status")
+SPEEDP_SET_MSG = SentMessage(SentMessageId.SPEEDP, SentMessageType.RESP_SET, "speedp")
+SPEEDP_GET_MSG = SentMessage(SentMessageId.SPEEDP, SentMessageType.RESP_GET, "speedp")
+DIR_CW_MSG = SentMessage(SentMessageId.DIR_CW, SentMessageType.RESP_SET, "dir_cw")
+DIR_CCW_MSG = SentMessage(SentMessageId.DIR_CCW, SentMessageType.RESP_SET, "dir_ccw")
+DIR_INVALID_MSG = SentMessage(None, SentMessageType.RESP_SET, "invalid")
+SPEEDR_SET_MSG = SentMessage(SentMessageId.SPEEDR, SentMessageType.RESP_SET, "set_speedr")
+SPEEDR_GET_MSG = SentMessage(SentMessageId.SPEEDR, SentMessageType.RESP_GET, "get_speedr")
+SET_ADDR_MSG = SentMessage(SentMessageId.SET_ADDR, SentMessageType.RESP_SET, "id")
+VOLUME_MSG = SentMessage(SentMessageId.VOLUME, SentMessageType.RESP_GET, "volume")
+VOLUME_REV_MSG = SentMessage(SentMessageId.VOLUME_REV, SentMessageType.RESP_GET, "volume_rev")
+UNIT_INDEX_SET_MSG = SentMessage(SentMessageId.UNIT_INDEX, SentMessageType.RESP_SET, "set_index")
+UNIT_INDEX_GET_MSG = SentMessage(SentMessageId.UNIT_INDEX, SentMessageType.RESP_GET, "get_index")
+RESET_CUMULATIVE_MSG = SentMessage(SentMessageId.RESET_CUMULATIVE, SentMessageType.RESP_SET, "reset_cumulative")
+
+
+async def test_serial_connection(monkeypatch):
+    """Verify that the serial client requests to create a serial connection."""
+    serial_transport = MagicMock()
+    serial_protocol = MagicMock()
 
+    async def connection(*args):
+        return serial_transport, serial_protocol
+
+    create_serial_connection = Mock(side_effect=connection)
+    monkeypatch.setattr(serial_asyncio, 'create_serial_connection', create_serial_connection)
+
+    mflx = MasterflexSerial("/dev/pts/1234", 115200)
+    await mflx.connect()
+
+    create_serial_connection.assert_called_once_with(
+        asyncio.get_running_loop(), mflx._protocol_factory, "/dev/pts/1234", 115200)
+
+
+async def test_wait_connected():
+    """Verify that waiting for the connection returns once the connection is made."""
+    mflx = MasterflexSerial("/dev/pts/1234")
+
+    serial_protocol = MagicMock()
+    mflx._connection_made(serial_protocol)
+
+    await mflx.wait_connected()
+    assert mflx.connected
+
+
+async def test_wait_connected_lost():
+    """Verify that waiting for the connection returns once the connection is lost."""
+    mflx = MasterflexSerial("/dev/pts/1234")
+
+    mflx._connection_made(MagicMock())
+    mflx._connection_lost()
+
+    await asyncio.wait_for(mflx.wait_connected(), 1)
+    assert not mflx.connected
 
-@pytest.mark.asyncio
-async def test_serial_connection():
-    """Verify that the serial client requests to create a serial connection."""
-    with mock.patch.object(serial_asyncio, 'create_serial_connection',
-                           return_value=asyncio.Future()) as create_serial_connection:
 
-        mflx = MasterflexSerial("/dev/pts/1234", 115200)
+@pytest.mark.parametrize("error", [serial.SerialException, ValueError, OSError])
+async def test_wait_connected_failed(monkeypatch, error):
+    """Verify that waiting for the connection returns once the connection attempt failed."""
 
-        serial_transport = MagicMock()
-        serial_protocol = MagicMock()
-        create_serial_connection.return_value.set_result((serial_transport, serial_protocol))
+    async def connection(*args):
+        raise error("failed")
+
+    monkeypatch.setattr(serial_asyncio, 'create_serial_connection', connection)
+    mflx = MasterflexSerial("/dev/pts/1234")
+    try:
         await mflx.connect()
+    except (ValueError, OSError):
+        pass
+
+    await asyncio.wait_for(mflx.wait_connected(), 1)
+    assert not mflx.connected
 
-        assert create_serial_connection.called
+
+@pytest.mark.parametrize("enabled", [True, False])
+async def test_low_latency(enabled):
+    """Verify that the low latency mode of the serial port is enabled on request."""
+    mflx = MasterflexSerial("/dev/pts/1234", low_latency=enabled)
+
+    serial_protocol = MagicMock()
+    mflx._connection_made(serial_protocol)
+
+    assert serial_protocol.transport.serial.set_low_latency_mode.called == enabled
 
 
-@pytest.mark.asyncio
 async def test_addr():
     """Verify that the serial address is set correctly by default."""
     mflx = MasterflexSerial("/dev/pts/1234")
     assert mflx.addr == "1"
 
 
-@pytest.mark.asyncio
 async def test_baud_rate():
     """Verify that the serial address is set correctly by default."""
     mflx = MasterflexSerial("/dev/pts/1234")
@@ -42,376 +117,327 @@ async def test_baud_rate():
     assert mflx.port == "/dev/pts/1234"
 
 
-@pytest.fixture
-def mflx_serial():
-    """Masterflex Serial Pytest fixture."""
-    mflx = MasterflexSerial("/dev/pts/1234")
-    mflx._protocol = MagicMock()
-    mflx._protocol.transport = MagicMock()
-    return mflx
+@pytest.fixture(scope="module")
+def event_loop():
+    """Run all the tests of this module on one event loop."""
+    loop = asyncio.get_event_loop_policy().new_event_loop()
+    yield loop
+    loop.close()
 
 
-async def mock_recv_data(mflx: MasterflexSerial, sent_msg: SentMessage, expected: json):
-    """Mock the data return from the serial port."""
-    await asyncio.sleep(0.1)
-    mflx._received_response_message(ReceivedMessage(sent_msg, expected))
-
+@pytest.fixture(scope="module")
+def mflx_serial_module():
+    """Masterflex Serial instance shared by the tests of this module."""
+    mflx = MasterflexSerial("/dev/pts/1234")
+    mflx._protocol = Mock(spec=SerialProtocol)
+    mflx._protocol.transport = Mock(spec=serial_asyncio.SerialTransport)
+    return mflx
 
-@pytest.mark.parametrize(
-    "msg_id, expected_result",
-    [(SentMessageId.ENABLE, {"result": "OK"}),
-     (SentMessageId.ENABLE, {"result": "Invalid"}),
-     (SentMessageId.ENABLE, {"result": "Not a pump message"})]
-)
-@pytest.mark.asyncio
-async def test_enable(mflx_serial: MasterflexSerial, msg_id: SentMessageId, expected_result: json):
-    """Verify that the ENABLE message is sent and received correctly to the pump."""
 
-    sent_msg = SentMessage(msg_id, SentMessageType.RESP_SET)
-    enable_task = asyncio.create_task(mflx_serial.enable())
-    recv_data_task = asyncio.create_task(mock_recv_data(mflx_serial, sent_msg, expected_result))
+@pytest.fixture
+def mflx_serial(mflx_serial_module):
+    """Masterflex Serial Pytest fixture, reset for each test."""
+    mflx = mflx_serial_module
+    mflx._protocol.reset_mock()
+    mflx._pending.clear()
+    mflx._cancel_response_timer()
+    mflx._addr = "1"
+    mflx._frames = _FRAMES["1"]
+    return mflx
 
-    try:
-        await asyncio.gather(enable_task, recv_data_task)
-    finally:
-        data = enable_task.result()
-        for k, val in data.items():
-            assert val == expected_result[k]
 
+async def run_cmd(mflx: MasterflexSerial, cmd, sent_msg: SentMessage, expected: dict):
+    """Run a command and mock its response from the serial port.
 
-@pytest.mark.parametrize(
-    "msg_id, expected_result",
-    [(SentMessageId.ENABLE, {"result": "OK"}),
-     (SentMessageId.ENABLE, {"result": "Invalid"}),
-     (SentMessageId.ENABLE, {"result": "Not a pump message"})]
-)
-@pytest.mark.asyncio
-async def test_disable(mflx_serial: MasterflexSerial, msg_id: SentMessageId, expected_result: json):
-    """Verify that the DISABLE message is sent correctly to the pump."""
+    Return the result of the command.
+    """
+    # The command sends its message before it first yields, the response is received right after
+    asyncio.get_running_loop().call_soon(mflx._received_response_message, ReceivedMessage(sent_msg, expected))
+    return await cmd
 
-    sent_msg = SentMessage(msg_id, SentMessageType.RESP_SET)
-    disable_task = asyncio.create_task(mflx_serial.disable())
-    recv_data_task = asyncio.create_task(mock_recv_data(mflx_serial, sent_msg, expected_result))
 
-    try:
-        await asyncio.gather(disable_task, recv_data_task)
-    finally:
-        data = disable_task.result()
-        for k, val in data.items():
-            assert val == expected_result[k]
+async def mock_recv_data(mflx: MasterflexSerial, sent_msg: SentMessage, expected: dict):
+    """Mock the data return from the serial port."""
+    # Yield once so the command sends its message before the response is received
+    await asyncio.sleep(0)
+    mflx._received_response_message(ReceivedMessage(sent_msg, expected))
 
 
 @pytest.mark.parametrize(
-    "expected_result",
-    [({'result': 'data', 'address': '1', 'motor_status': 'stopped', 'direction': 'cw'}),
-     ({'result': 'data', 'address': '1', 'motor_status': 'running', 'direction': 'ccw'}),
-     ({'result': 'data', 'address': '1', 'motor_status': 'stopped', 'direction': 'cw'}),
-     ({'result': 'data', 'address': '1', 'motor_status': 'running', 'direction': 'ccw'}),
-     ({'result': 'invalid', 'error': 'Invalid serial address'}),
-     ({'result': 'invalid', 'error': 'Invalid motor status'}),
-     ({'result': 'invalid', 'error': 'Invalid pump direction'})]
+    "method_name, sent_msg",
+    [("enable", ENABLE_MSG),
+     ("disable", DISABLE_MSG),
+     ("start", START_MSG),
+     ("stop", STOP_MSG),
+     ("reset_cumulative", RESET_CUMULATIVE_MSG)]
 )
-@pytest.mark.asyncio
-async def test_status(mflx_serial: MasterflexSerial, expected_result: json):
-    """Verify that the STATUS message is sent correctly to the pump.
-
-    Plus, verify that the received message is handled correctly.
-    """
-
-    sent_msg = SentMessage(SentMessageId.STATUS, SentMessageType.RESP_GET, "status")
-    get_status_task = asyncio.create_task(mflx_serial.status())
-    recv_data_task = asyncio.create_task(mock_recv_data(mflx_serial, sent_msg, expected_result))
-
-    # Call the status() function and await the response
-    try:
-        await asyncio.gather(get_status_task, recv_data_task)
-    finally:
-        data = get_status_task.result()
-        for k, v in data.items():
-            assert v == expected_result[k]
-
-
 @pytest.mark.parametrize(
     "expected_result",
-    [({"result": "OK"}),
-     ({"result": "Invalid"}),
+    [RESP_OK,
+     RESP_INVALID,
      ({"result": "*$()&"}),
-     ({"result": "Not in Serial Comms mode"})]
+     RESP_NOT_IN_SERIAL_MODE,
+     RESP_NOT_A_PUMP_MESSAGE]
 )
-@pytest.mark.asyncio
-async def test_start(mflx_serial: MasterflexSerial, expected_result: json):
-    """Verify that the START message is sent correctly to the pump."""
-
-    sent_msg = SentMessage(SentMessageId.START, SentMessageType.RESP_SET)
-    start_task = asyncio.create_task(mflx_serial.start())
+async def test_set_resp(mflx_serial, method_name, sent_msg, expected_result):
+    """Verify that the SET messages without parameter are sent correctly to the pump."""
 
-    recv_data_task = asyncio.create_task(mock_recv_data(mflx_serial, sent_msg, expected_result))
-
-    try:
-        await asyncio.gather(start_task, recv_data_task)
-    finally:
-        data = start_task.result()
-        for k, v in data.items():
-            assert v == expected_result[k]
+    data = await run_cmd(mflx_serial, getattr(mflx_serial, method_name)(), sent_msg, expected_result)
+    assert data.items() <= expected_result.items()
 
 
 @pytest.mark.parametrize(
-    "expected_result",
-    [({"result": "OK"}),
-     ({"result": "Invalid"}),
-     ({"result": "*$()&"}),
-     ({"result": "Not in Serial Comms mode"})]
+    "getter, sent_msg, expected_result",
+    [("status", STATUS_MSG, {'result': 'data', 'address': '1', 'motor_status': 'stopped', 'direction': 'cw'}),
+     ("status", STATUS_MSG, {'result': 'data', 'address': '1', 'motor_status': 'running', 'direction': 'ccw'}),
+     ("status", STATUS_MSG, {'result': 'invalid', 'error': 'Invalid serial address'}),
+     ("status", STATUS_MSG, {'result': 'invalid', 'error': 'Invalid motor status'}),
+     ("status", STATUS_MSG, {'result': 'invalid', 'error': 'Invalid pump direction'}),
+     ("speed_percent", SPEEDP_GET_MSG, {'result': 'data', 'speed': '60.0', 'unit': '%'}),
+     ("speed_percent", SPEEDP_GET_MSG, {'result': 'invalid', 'error': 'Invalid data format'}),
+     ("speed_percent", SPEEDP_GET_MSG, {'result': 'invalid', 'error': 'Invalid percentage value'}),
+     ("speed_rpm", SPEEDR_GET_MSG, {'result': 'data', 'speed': '105.00', 'unit': 'RPM'}),
+     ("speed_rpm", SPEEDR_GET_MSG, RESP_NOT_IN_SERIAL_MODE),
+     ("volume", VOLUME_MSG, {'result': 'data', 'volume': 20993.466, 'unit': 'mL'}),
+     ("volume", VOLUME_MSG, RESP_NOT_IN_SERIAL_MODE),
+     ("volume_rev", VOLUME_REV_MSG, {'result': 'data', 'volume': 7497.667, 'unit': 'rev'}),
+     ("volume_rev", VOLUME_REV_MSG, RESP_NOT_IN_SERIAL_MODE)]
 )
-@pytest.mark.asyncio
-async def test_stop(mflx_serial, expected_result: json):
-    """Verify that the STOP SET message is sent correctly to the pump."""
+async def test_get_resp(mflx_serial, getter, sent_msg, expected_result):
+    """Verify that the GET messages are sent correctly to the pump.
 
-    sent_msg = SentMessage(SentMessageId.STOP, SentMessageType.RESP_SET)
-    stop_task = asyncio.create_task(mflx_serial.stop())
-    recv_data_task = asyncio.create_task(mock_recv_data(mflx_serial, sent_msg, expected_result))
+    Plus, verify that the received message is handled correctly.
+    """
 
-    try:
-        await asyncio.gather(stop_task, recv_data_task)
-    finally:
-        data = stop_task.result()
-        for k, v in data.items():
-            assert v == expected_result[k]
+    data = await run_cmd(mflx_serial, getattr(mflx_serial, getter)(), sent_msg, expected_result)
+    assert data.items() <= expected_result.items()
 
 
 @pytest.mark.parametrize(
     "input, expected_result",
-    [("50", {"result": "OK"}),
+    [("50", RESP_OK),
      ("00605", {"result": "Invalid", "error": "Speed in percent must be from 0 to 100"}),
      ("-9", {"result": "Invalid", "error": "Speed in percent must be from 0 to 100"}),
      ("101", {"result": "Invalid", "error": "Speed in percent must be from 0 to 100"}),
-     ("50", {"result": "Not in Serial Comms mode"}),
-     ("abc", {"result": "Invalid", "error": "Not a number. Speed in percent must be from 0 to 100"})]
+     ("50", RESP_NOT_IN_SERIAL_MODE),
+     ("abc", {"result": "Invalid", "error": "Not a number. Speed in percent must be from 0 to 100"}),
+     ("nan", {"result": "Invalid", "error": "Not a number. Speed in percent must be from 0 to 100"})]
 )
-@pytest.mark.asyncio
 async def test_speedp_set(mflx_serial, input, expected_result):
     """Verify that the SPEEDP set message is sent correctly to the pump.
 
     Plus, verify that the received message is handled correctly.
     """
 
-    sent_msg = SentMessage(SentMessageId.SPEEDP, SentMessageType.RESP_SET, "speedp")
-    set_speedp_task = asyncio.create_task(mflx_serial.speed_percent(input))
-    recv_data_task = asyncio.create_task(mock_recv_data(mflx_serial, sent_msg, expected_result))
-
     # Call the SET speed_percent() function and await the response
-    try:
-        await asyncio.gather(set_speedp_task, recv_data_task)
-    finally:
-        data = set_speedp_task.result()
-        for k, v in data.items():
-            assert v == expected_result[k]
+    data = await run_cmd(mflx_serial, mflx_serial.speed_percent(input), SPEEDP_SET_MSG, expected_result)
+    assert data.items() <= expected_result.items()
 
 
 @pytest.mark.parametrize(
-    "expected_result",
-    [({'result': 'data', 'speed': '60.0', 'unit': '%'}),
-     ({'result': 'invalid', 'error': 'Invalid data format'}),
-     ({'result': 'invalid', 'error': 'Invalid percentage value'})]
+    "sent_msg, dir, expected_result",
+    [(DIR_CW_MSG, "cw", RESP_OK),
+     (DIR_CW_MSG, "cw", RESP_NOT_IN_SERIAL_MODE),
+     (DIR_CCW_MSG, "ccw", RESP_OK),
+     (DIR_CCW_MSG, "ccw", RESP_NOT_IN_SERIAL_MODE),
+     (DIR_INVALID_MSG, "c-cw",
+      {"result": "Invalid", "error": "Invalid param. Valid inputs: 'cw' or 'ccw'"}),
+     (DIR_INVALID_MSG, ["cw"],
+      {"result": "Invalid", "error": "Invalid param. Valid inputs: 'cw' or 'ccw'"}),
+     (DIR_INVALID_MSG, None,
+      {"result": "Invalid", "error": "Invalid param. Valid inputs: 'cw' or 'ccw'"})]
 )
-@pytest.mark.asyncio
-async def test_speedp_get(mflx_serial, expected_result):
-    """Verify that the SPEEDP get message is recieve correctly from the pump.
-
-    Plus, verify that the received message is handled correctly.
-    """
-
-    sent_msg = SentMessage(SentMessageId.SPEEDP, SentMessageType.RESP_GET, "speedp")
-    get_speedp_task = asyncio.create_task(mflx_serial.speed_percent())
-    recv_data_task = asyncio.create_task(mock_recv_data(mflx_serial, sent_msg, expected_result))
-
-    # Call the GET speed_percent() function and await the response
-    try:
-        await asyncio.gather(get_speedp_task, recv_data_task)
-    finally:
-        data = get_speedp_task.result()
-        for k, v in data.items():
-            assert v == expected_result[k]
-
-
-@pytest.mark.parametrize(
-    "msg_id, name, dir, expected_result",
-    [(SentMessageId.DIR_CW, "dir_cw", "cw", {"result": "OK"}),
-     (SentMessageId.DIR_CW, "dir_cw", "cw", {"result": "Not in Serial Comms mode"}),
-     (SentMessageId.DIR_CCW, "dir_ccw", "ccw", {"result": "OK"}),
-     (SentMessageId.DIR_CCW, "dir_ccw", "ccw", {"result": "Not in Serial Comms mode"}),
-     (None, "invalid", "c-cw", {"result": "Invalid", "error": "Invalid param. Valid inputs: 'cw' or 'ccw'"})]
-)
-@pytest.mark.asyncio
-async def test_dir(mflx_serial, msg_id, name, dir, expected_result):
+async def test_dir(mflx_serial, sent_msg, dir, expected_result):
     """Verify that the DIRECTION SET message is sent correctly to the pump."""
 
-    sent_msg = SentMessage(msg_id, SentMessageType.RESP_SET, name)
-    dir_task = asyncio.create_task(mflx_serial.set_dir(dir))
-    recv_data_task = asyncio.create_task(mock_recv_data(mflx_serial, sent_msg, expected_result))
-
-    try:
-        await asyncio.gather(dir_task, recv_data_task)
-    finally:
-        data = dir_task.result()
-        for k, v in data.items():
-            assert v == expected_result[k]
+    data = await run_cmd(mflx_serial, mflx_serial.set_dir(dir), sent_msg, expected_result)
+    assert data.items() <= expected_result.items()
 
 
 @pytest.mark.parametrize(
-    "resp_type, name, value, expected_result",
-    [(SentMessageType.RESP_GET, "get_speedr", None, {'result': 'data', 'speed': '105.00', 'unit': 'RPM'}),
-     (SentMessageType.RESP_GET, "get_speedr", None, {"result": "Not in Serial Comms mode"}),
-     (SentMessageType.RESP_SET, "set_speedr", "205.75", {"result": "OK"}),
-     (SentMessageType.RESP_SET, "set_speedr", "150", {"result": "OK"}),
-     (SentMessageType.RESP_SET, "set_speedr", "175.4579249", {"result": "OK"}),
-     (SentMessageType.RESP_SET, "set_speedr", "800", {"result": "Invalid"}),
-     (SentMessageType.RESP_SET, "set_speedr", "175.45", {"result": "Not in Serial Comms mode"}),
-     (SentMessageType.RESP_SET, "set_speedr", "abc", {"result": "Invalid",
+    "sent_msg, value, expected_result",
+    [(SPEEDR_SET_MSG, "205.75", RESP_OK),
+     (SPEEDR_SET_MSG, "150", RESP_OK),
+     (SPEEDR_SET_MSG, 150, RESP_OK),
+     (SPEEDR_SET_MSG, "175.4579249", RESP_OK),
+     (SPEEDR_SET_MSG, "800", RESP_INVALID),
+     (SPEEDR_SET_MSG, "175.45", RESP_NOT_IN_SERIAL_MODE),
+     (SPEEDR_SET_MSG, "abc", {"result": "Invalid",
       "error": "Invalid param. Valid inputs: int or float"}),
-     (SentMessageType.RESP_SET, "set_speedr", "99999", {"result": "Invalid",
+     (SPEEDR_SET_MSG, "99999", {"result": "Invalid",
       "error": "Value out of range. Pumps range in RPM: 0 to 9999.99"})]
 )
-@pytest.mark.asyncio
-async def test_speed_rpm(mflx_serial, resp_type, name, value, expected_result):
-    """Verify that the GET/SET speed in RPM message is sent correctly to/from the pump."""
-
-    sent_msg = SentMessage(SentMessageId.SPEEDR, resp_type, name)
-    speed_rpm_task = asyncio.create_task(mflx_serial.speed_rpm(value))
-    recv_data_task = asyncio.create_task(mock_recv_data(mflx_serial, sent_msg, expected_result))
+async def test_speed_rpm(mflx_serial, sent_msg, value, expected_result):
+    """Verify that the SET speed in RPM message is sent correctly to the pump."""
 
-    try:
-        await asyncio.gather(speed_rpm_task, recv_data_task)
-    finally:
-        data = speed_rpm_task.result()
-        for k, v in data.items():
-            assert v == expected_result[k]
+    data = await run_cmd(mflx_serial, mflx_serial.speed_rpm(value), sent_msg, expected_result)
+    assert data.items() <= expected_result.items()
 
 
 @pytest.mark.parametrize(
     "input, expected_result",
-    [("1", {"result": "OK"}),
+    [("1", RESP_OK),
      ("9", {"result": "Invalid", "error": "Address must be between 1 and 8"}),
+     (1, RESP_OK),
+     (1.0, RESP_OK),
+     (" 1", RESP_OK),
+     (True, RESP_OK),
      ("1.2", {"result": "Invalid", "error": "Not a valid number. Address must be integer between 1 and 8"}),
+     (1.2, {"result": "Invalid", "error": "Not a valid number. Address must be integer between 1 and 8"}),
      ("abc", {"result": "Invalid", "error": "Not a valid number. Address must be integer between 1 and 8"})]
 )
-@pytest.mark.asyncio
 async def test_addr_set(mflx_serial, input, expected_result):
     """Verify that the ADDR SET message is sent correctly to the pump.
 
     Plus, verify that the received message is handled correctly.
     """
 
-    sent_msg = SentMessage(SentMessageId.SET_ADDR, SentMessageType.RESP_SET, "id")
-    set_addr_task = asyncio.create_task(mflx_serial.set_addr(input))
-    recv_data_task = asyncio.create_task(mock_recv_data(mflx_serial, sent_msg, expected_result))
-
     # Call the set_addr() function and await the response
-    try:
-        await asyncio.gather(set_addr_task, recv_data_task)
-    finally:
-        data = set_addr_task.result()
-        for k, v in data.items():
-            assert v == expected_result[k]
+    data = await run_cmd(mflx_serial, mflx_serial.set_addr(input), SET_ADDR_MSG, expected_result)
+    assert data.items() <= expected_result.items()
 
 
 @pytest.mark.parametrize(
-    "expected_result",
-    [({'result': 'data', 'volume': 20993.466, 'unit': 'mL'}),
-     ({'result': 'Not in Serial Comms mode'})]
+    "sent_msg, value, expected_result",
+    [(UNIT_INDEX_GET_MSG, None, {'result': 'data', 'index': '3'}),
+     (UNIT_INDEX_GET_MSG, None, RESP_NOT_IN_SERIAL_MODE),
+     (UNIT_INDEX_SET_MSG, "03", RESP_OK),
+     (UNIT_INDEX_SET_MSG, "07", RESP_NOT_IN_SERIAL_MODE),
+     (UNIT_INDEX_SET_MSG, "5", RESP_OK),
+     (UNIT_INDEX_SET_MSG, "000001", RESP_OK),
+     (UNIT_INDEX_SET_MSG, 3.0, RESP_OK),
+     (UNIT_INDEX_SET_MSG, " 5", RESP_OK),
+     (UNIT_INDEX_SET_MSG, "1_0", RESP_OK),
+     (UNIT_INDEX_SET_MSG, True, RESP_OK),
+     (UNIT_INDEX_SET_MSG, 3.5, {"result": "Invalid",
+      "error": "Invalid param. Valid inputs: integer"}),
+     (UNIT_INDEX_SET_MSG, "abc", {"result": "Invalid",
+      "error": "Invalid param. Valid inputs: integer"}),
+     (UNIT_INDEX_SET_MSG, "35", {"result": "Invalid",
+      "error": "Value out of range. Pumps flow unit index range: 0 to 32"}),
+     (UNIT_INDEX_SET_MSG, "-1", {"result": "Invalid",
+      "error": "Value out of range. Pumps flow unit index range: 0 to 32"})]
 )
-@pytest.mark.asyncio
-async def test_volume_get(mflx_serial, expected_result):
-    """Verify that the VOLUME get message is recieve correctly from the pump.
+async def test_unit_index(mflx_serial, sent_msg, value, expected_result):
+    """Verify that the GET/SET flow unit index is sent correctly to/from the pump."""
 
-    Plus, verify that the received message is handled correctly.
-    """
+    data = await run_cmd(mflx_serial, mflx_serial.unit_index(value), sent_msg, expected_result)
+    assert data.items() <= expected_result.items()
 
-    sent_msg = SentMessage(SentMessageId.VOLUME, SentMessageType.RESP_GET, "volume")
-    get_volume_task = asyncio.create_task(mflx_serial.volume())
-    recv_data_task = asyncio.create_task(mock_recv_data(mflx_serial, sent_msg, expected_result))
 
-    # Call the volume() function and await the response
-    try:
-        await asyncio.gather(get_volume_task, recv_data_task)
-    finally:
-        data = get_volume_task.result()
-        for k, v in data.items():
-            assert v == expected_result[k]
+async def test_invalid_param_response_copied(mflx_serial):
+    """Verify that modifying an error response does not change the next ones."""
+
+    response = await mflx_serial.speed_rpm("abc")
+    response["ts"] = 1
+    assert "ts" not in await mflx_serial.speed_rpm("abc")
+
+    response = await mflx_serial.set_dir("up")
+    response["ts"] = 1
+    assert "ts" not in await mflx_serial.set_dir("up")
 
 
 @pytest.mark.parametrize(
-    "expected_result",
-    [({'result': 'data', 'volume': 7497.667, 'unit': 'rev'}),
-     ({'result': 'Not in Serial Comms mode'})]
+    "value, expected",
+    [(3, 3), ("03", 3), ("-1", -1), (" 5", 5), (3.0, 3), (True, 1), ("1_0", 10),
+     (3.5, None), ("3.0", None), ("abc", None), ("", None), (None, None), (float("nan"), None)]
 )
-@pytest.mark.asyncio
-async def test_volume_rev_get(mflx_serial, expected_result):
-    """Verify that the VOLUME get message is recieve correctly from the pump.
+async def test_to_int(value, expected):
+    """Verify that the integer parameters are converted like int() does, without raising."""
+    assert _to_int(value) == expected
 
-    Plus, verify that the received message is handled correctly.
-    """
 
-    sent_msg = SentMessage(SentMessageId.VOLUME_REV, SentMessageType.RESP_GET, "volume_rev")
-    get_volume_rev_task = asyncio.create_task(mflx_serial.volume_rev())
-    recv_data_task = asyncio.create_task(mock_recv_data(mflx_serial, sent_msg, expected_result))
+async def test_send_many(mflx_serial):
+    """Verify that queued messages are sent one at a time and answered in order."""
 
-    # Call the volume_rev() function and await the response
-    try:
-        await asyncio.gather(get_volume_rev_task, recv_data_task)
-    finally:
-        data = get_volume_rev_task.result()
-        for k, v in data.items():
-            assert v == expected_result[k]
+    send_task = asyncio.create_task(mflx_serial.send_many([(START_MSG, None), (STOP_MSG, None)]))
 
+    # send_many() gathers its messages as tasks, let them all queue their message
+    for _ in range(10):
+        if len(mflx_serial._pending) == 2:
+            break
+        await asyncio.sleep(0)
+    # Only the first message is sent until the pump answers it
+    mflx_serial._protocol.transport.write.assert_called_once_with(b"1H\r")
 
-@pytest.mark.parametrize(
-    "expected_result",
-    [({"result": "OK"}),
-     ({"result": "Invalid"}),
-     ({"result": "*$()&"}),
-     ({"result": "Not in Serial Comms mode"})]
-)
-@pytest.mark.asyncio
-async def test_reset_cumulative(mflx_serial, expected_result):
-    """Verify that the RESET Cumulative Volume message is sent correctly to the pump."""
+    await mock_recv_data(mflx_serial, START_MSG, RESP_OK)
+    mflx_serial._protocol.transport.write.assert_called_with(b"1I\r")
 
-    sent_msg = SentMessage(SentMessageId.RESET_CUMULATIVE, SentMessageType.RESP_SET)
-    reset_cumulative_task = asyncio.create_task(mflx_serial.reset_cumulative())
-    recv_data_task = asyncio.create_task(mock_recv_data(mflx_serial, sent_msg, expected_result))
+    await mock_recv_data(mflx_serial, STOP_MSG, RESP_INVALID)
+    assert await send_task == [RESP_OK, RESP_INVALID]
+    assert mflx_serial._protocol.transport.write.call_count == 2
 
-    # Call the reset_cumulative() function and await the response
-    try:
-        await asyncio.gather(reset_cumulative_task, recv_data_task)
-    finally:
-        data = reset_cumulative_task.result()
-        for k, v in data.items():
-            assert v == expected_result[k]
 
+async def test_response_timeout(mflx_serial):
+    """Verify that a command still gets sent after the previous one timed out."""
 
-@pytest.mark.parametrize(
-    "resp_type, name, value, expected_result",
-    [(SentMessageType.RESP_GET, "get_index", None, {'result': 'data', 'index': '3'}),
-     (SentMessageType.RESP_GET, "get_index", None, {"result": "Not in Serial Comms mode"}),
-     (SentMessageType.RESP_SET, "set_index", "03", {"result": "OK"}),
-     (SentMessageType.RESP_SET, "set_index", "07", {"result": "Not in Serial Comms mode"}),
-     (SentMessageType.RESP_SET, "set_index", "5", {"result": "OK"}),
-     (SentMessageType.RESP_SET, "set_index", "000001", {"result": "OK"}),
-     (SentMessageType.RESP_SET, "set_index", "abc", {"result": "Invalid",
-      "error": "Invalid param. Valid inputs: integer"}),
-     (SentMessageType.RESP_SET, "set_index", "35", {"result": "Invalid",
-      "error": "Value out of range. Pumps flow unit index range: 0 to 32"})]
-)
-@pytest.mark.asyncio
-async def test_unit_index(mflx_serial, resp_type, name, value, expected_result):
-    """Verify that the GET/SET flow unit index is sent correctly to/from the pump."""
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(mflx_serial.status(), 0.01)
 
-    sent_msg = SentMessage(SentMessageId.UNIT_INDEX, resp_type, name)
-    unit_index_task = asyncio.create_task(mflx_serial.unit_index(value))
-    recv_data_task = asyncio.create_task(mock_recv_data(mflx_serial, sent_msg, expected_result))
+    # Bounded wait, a stalled queue would never send the start message
+    data = await asyncio.wait_for(run_cmd(mflx_serial, mflx_serial.start(), START_MSG, RESP_OK), 1)
+    assert data == RESP_OK
+    mflx_serial._protocol.transport.write.assert_called_with(b"1H\r")
+    assert not mflx_serial._pending
 
-    try:
-        await asyncio.gather(unit_index_task, recv_data_task)
-    finally:
-        data = unit_index_task.result()
-        for k, v in data.items():
-            assert v == expected_result[k]
+
+async def test_queued_message_cancelled(mflx_serial):
+    """Verify that a cancelled command waiting in the queue is never sent."""
+
+    status_task = asyncio.ensure_future(mflx_serial.status())
+    start_task = asyncio.ensure_future(mflx_serial.start())
+    stop_task = asyncio.ensure_future(mflx_serial.stop())
+    await asyncio.sleep(0)
+    start_task.cancel()
+
+    await mock_recv_data(mflx_serial, STATUS_MSG, RESP_OK)
+    await mock_recv_data(mflx_serial, STOP_MSG, RESP_OK)
+    assert await status_task == RESP_OK
+    assert await asyncio.wait_for(stop_task, 1) == RESP_OK
+    assert start_task.cancelled()
+    assert [c[0][0] for c in mflx_serial._protocol.transport.write.call_args_list] == [b"1RC\r", b"1I\r"]
+
+
+async def test_response_lost():
+    """Verify that a message without response is answered with an error, and the next one is sent."""
+    mflx = MasterflexSerial("/dev/pts/1234", response_timeout=0.01)
+    serial_protocol = MagicMock()
+    mflx._connection_made(serial_protocol)
+
+    status_task = asyncio.ensure_future(mflx.status())
+    start_task = asyncio.ensure_future(mflx.start())
+    await asyncio.sleep(0)
+    serial_protocol.transport.write.assert_called_once_with(b"1RC\r")
+
+    assert await asyncio.wait_for(status_task, 1) == {"result": "Invalid", "error": "No response from the pump"}
+    serial_protocol.transport.write.assert_called_with(b"1H\r")
+
+    mflx._received_response_message(ReceivedMessage(START_MSG, RESP_OK))
+    assert await start_task == RESP_OK
+    assert mflx._response_timer is None
+
+
+async def test_connection_lost():
+    """Verify that the commands waiting for the pump are answered when the connection is lost."""
+    mflx = MasterflexSerial("/dev/pts/1234")
+    mflx._connection_made(MagicMock())
+
+    start_task = asyncio.ensure_future(mflx.start())
+    stop_task = asyncio.ensure_future(mflx.stop())
+    await asyncio.sleep(0)
+    mflx._connection_lost()
+
+    expected = {"result": "Invalid", "error": "Connection lost"}
+    assert await start_task == expected
+    assert await stop_task == expected
+    assert not mflx._pending
+
+
+async def test_addr_set_messages(mflx_serial):
+    """Verify that the messages are sent to the new address once it is set."""
+
+    await run_cmd(mflx_serial, mflx_serial.set_addr("2"), SET_ADDR_MSG, RESP_OK)
+    mflx_serial._protocol.transport.write.assert_called_with(b"@2\r")
+
+    await run_cmd(mflx_serial, mflx_serial.start(), START_MSG, RESP_OK)
+    mflx_serial._protocol.transport.write.assert_called_with(b"2H\r")
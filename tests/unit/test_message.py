@@ -98,3 +98,12 @@ def test_received_message(id, msg_type, name, data):
     assert recv_msg_json["id"] == sent_msg.id.value
     assert recv_msg_json["name"] == name
     assert recv_msg_json["data"] == data
+
+
+def test_message_str_format():
+    """Verify that the messages are formatted with the standard json module layout."""
+    sent_msg = SentMessage(SentMessageId.START, SentMessageType.RESP_SET, "start")
+    recv_msg = ReceivedMessage(sent_msg, {"speed": float("nan")})
+
+    assert str(sent_msg) == '{"id": "H", "type": "set", "name": "start"}'
+    assert str(recv_msg) == '{"success": false, "id": "H", "name": "start", "data": {"speed": NaN}}'
@@ -3,7 +3,13 @@
 import pytest
 from masterflexserial.message import SentMessage, SentMessageId, SentMessageType,\
     ReceivedMessage
-from masterflexserial.protocol import Decoder
+from masterflexserial.protocol import Decoder, SerialProtocol, RESP_OK
+
+
+@pytest.fixture(scope="module")
+def decoder():
+    """Share one Decoder between the tests of the stateless decode methods."""
+    return Decoder()
 
 
 class TestDecoder:
@@ -36,10 +42,20 @@ class TestDecoder:
         uut = Decoder(recv_message_callback)
         sent_msg = SentMessage(SentMessageId.ENABLE, SentMessageType.RESP_SET, "enable")
         uut.set_last_message(sent_msg)
-        uut.client_decode(message_text.encode('utf-8'))
+        uut.client_decode(message_text)
         assert self.recv_msg.data["result"] == expected
         assert self.recv_msg.sent_msg.id == sent_msg.id
 
+    def test_client_decode_not_expected(self):
+        """Verify that input without a message waiting for the response is dropped."""
+
+        received = []
+        uut = Decoder(received.append)
+        uut.client_decode("*")
+        uut.set_last_message(SentMessage(SentMessageId.ENABLE, SentMessageType.RESP_SET, "enable"))
+        uut.client_decode("")
+        assert received == []
+
     @pytest.mark.parametrize(
         "input, expected",
         [("1,0,0", {'result': 'data', 'address': '1', 'motor_status': 'stopped', 'direction': 'cw'}),
@@ -47,19 +63,19 @@ class TestDecoder:
          ("1,1,0", {'result': 'data', 'address': '1', 'motor_status': 'running', 'direction': 'cw'}),
          ("1,1,1", {'result': 'data', 'address': '1', 'motor_status': 'running', 'direction': 'ccw'}),
          ("9,0,0", {'result': 'invalid', 'error': 'Invalid serial address'}),
+         ("0,0,0", {'result': 'invalid', 'error': 'Invalid serial address'}),
          ("1,2,0", {'result': 'invalid', 'error': 'Invalid motor status'}),
-         ("1,0,2", {'result': 'invalid', 'error': 'Invalid pump direction'})]
+         ("1,0,2", {'result': 'invalid', 'error': 'Invalid pump direction'}),
+         ("x,0,0", {'result': 'invalid', 'error': 'Invalid data format'}),
+         ("1,0,0,0", {'result': 'invalid', 'error': 'Invalid data format'})]
     )
-    @pytest.mark.asyncio
-    async def test_decode_status(self, input, expected):
+    def test_decode_status(self, decoder, input, expected):
         """Verify that reponded status message from pump is decoded correctly."""
 
-        uut = Decoder()
         sent_msg = SentMessage(SentMessageId.STATUS, SentMessageType.RESP_GET, "status")
         recv_msg = ReceivedMessage(sent_msg)
-        output = uut.decode_status(input)
-        for k in output.keys():
-            assert output[k] == expected[k]
+        output = decoder.decode_status(input)
+        assert output.items() <= expected.items()
         assert recv_msg.sent_msg.id == sent_msg.id
 
     @pytest.mark.parametrize(
@@ -69,18 +85,16 @@ class TestDecoder:
          ("6x", {'result': 'Invalid', 'error': 'Invalid data format'}),
          ("6 0", {'result': 'Invalid', 'error': 'Invalid data format'}),
          ("-1", {'result': 'Invalid', 'error': 'Invalid percentage value'}),
-         ("101", {'result': 'Invalid', 'error': 'Invalid percentage value'})]
+         ("101", {'result': 'Invalid', 'error': 'Invalid percentage value'}),
+         ("inf", {'result': 'Invalid', 'error': 'Invalid data format'})]
     )
-    @pytest.mark.asyncio
-    async def test_decode_speedp(self, input, expected):
+    def test_decode_speedp(self, decoder, input, expected):
         """Verify that reponded status message from pump is decoded correctly."""
 
-        uut = Decoder()
         sent_msg = SentMessage(SentMessageId.SPEEDP, SentMessageType.RESP_GET, "speedp")
         recv_msg = ReceivedMessage(sent_msg)
-        output = uut.decode_speedp(input)
-        for k in output.keys():
-            assert output[k] == expected[k]
+        output = decoder.decode_speedp(input)
+        assert output.items() <= expected.items()
         assert recv_msg.sent_msg.id == sent_msg.id
 
     @pytest.mark.parametrize(
@@ -88,16 +102,90 @@ class TestDecoder:
         [("20993.466 mL", {'result': 'data', 'volume': 20993.466, 'unit': 'mL'}),
          ("x mL", {'result': 'Invalid', 'error': 'Invalid data format'}),
          ("", {'result': 'Invalid', 'error': 'Invalid data format'}),
-         ("20993.466 0", {'result': 'Invalid', 'error': 'Invalid data format'})]
+         ("20993.466 0", {'result': 'Invalid', 'error': 'Invalid data format'}),
+         ("20993.466 ", {'result': 'Invalid', 'error': 'Invalid data format'})]
     )
-    @pytest.mark.asyncio
-    async def test_decode_volume(self, input, expected):
+    def test_decode_volume(self, decoder, input, expected):
         """Verify that reponded status message from pump is decoded correctly."""
 
-        uut = Decoder()
         sent_msg = SentMessage(SentMessageId.VOLUME, SentMessageType.RESP_GET, "volume")
         recv_msg = ReceivedMessage(sent_msg)
-        output = uut.decode_volume(input)
-        for k in output.keys():
-            assert output[k] == expected[k]
+        output = decoder.decode_volume(input)
+        assert output.items() <= expected.items()
         assert recv_msg.sent_msg.id == sent_msg.id
+
+    def test_decode_error_copied(self, decoder):
+        """Verify that modifying a decoding error does not change the next ones."""
+
+        decoder.decode_status("x")["ts"] = 1
+        decoder.decode_speedp("x")["ts"] = 1
+        assert "ts" not in decoder.decode_status("x")
+        assert "ts" not in decoder.decode_speedp("x")
+
+
+class TestSerialProtocol:
+    """Unit tests for the serial data received from the pump."""
+
+    def test_stale_input_dropped(self):
+        """Verify that an incomplete response does not corrupt the response to the next message."""
+
+        received = []
+        uut = SerialProtocol(None, None, _resp_message=received.append)
+        uut.set_last_message(SentMessage(SentMessageId.SPEEDR, SentMessageType.RESP_GET))
+        uut.data_received(b"15")
+        uut.set_last_message(SentMessage(SentMessageId.START, SentMessageType.RESP_SET))
+        uut.data_received(b"*")
+        assert len(received) == 1
+        assert received[0].success
+        assert received[0].data == RESP_OK
+
+    @pytest.mark.parametrize("chunk", [b"*", b"* "])
+    def test_set_response_copied(self, chunk):
+        """Verify that modifying a decoded SET response does not change the next ones."""
+
+        received = []
+        uut = SerialProtocol(None, None, _resp_message=received.append)
+        for _ in range(2):
+            uut.set_last_message(SentMessage(SentMessageId.START, SentMessageType.RESP_SET))
+            uut.data_received(chunk)
+            received[-1].data["ts"] = 1
+        assert received[0].data is not received[1].data
+        assert RESP_OK == {"result": "OK"}
+
+    @pytest.mark.parametrize(
+        "msg_id, msg_type, chunks, expected",
+        [(SentMessageId.ENABLE, SentMessageType.RESP_SET, [b"*"], {"result": "OK"}),
+         (SentMessageId.ENABLE, SentMessageType.RESP_SET, [b"#"], {"result": "Invalid"}),
+         (SentMessageId.ENABLE, SentMessageType.RESP_SET, [b"~"], {"result": "Not in Serial Comms mode"}),
+         (SentMessageId.ENABLE, SentMessageType.RESP_SET, [b"?"], {"result": "Not a pump message"}),
+         (SentMessageId.SPEEDR, SentMessageType.RESP_GET, [b"150.0\r\n"],
+          {"result": "data", "speed": 150.0, "unit": "rpm"}),
+         (SentMessageId.SPEEDR, SentMessageType.RESP_GET, [b"15", b"0.0\r", b"\n"],
+          {"result": "data", "speed": 150.0, "unit": "rpm"}),
+         (SentMessageId.SPEEDR, SentMessageType.RESP_GET, [b"150.0\r"],
+          {"result": "data", "speed": 150.0, "unit": "rpm"}),
+         (SentMessageId.SPEEDR, SentMessageType.RESP_GET, [b"150.0\n"],
+          {"result": "data", "speed": 150.0, "unit": "rpm"}),
+         (SentMessageId.VOLUME_REV, SentMessageType.RESP_GET, [b"12.5\r\n"],
+          {"result": "data", "index": 12.5, "unit": "rev"}),
+         (SentMessageId.UNIT_INDEX, SentMessageType.RESP_GET, [b"3\r\n"], {"result": "data", "index": 3}),
+         (SentMessageId.SPEEDR, SentMessageType.RESP_GET, [b"~"], {"result": "Not in Serial Comms mode"}),
+         (SentMessageId.SPEEDR, SentMessageType.RESP_GET, [b"abc\r\n"],
+          {"result": "Invalid", "error": "Invalid data format"}),
+         (SentMessageId.VOLUME_REV, SentMessageType.RESP_GET, [b"1x\r\n"],
+          {"result": "Invalid", "error": "Invalid data format"}),
+         (SentMessageId.UNIT_INDEX, SentMessageType.RESP_GET, [b"3.5\r\n"],
+          {"result": "Invalid", "error": "Invalid data format"}),
+         (SentMessageId.START, SentMessageType.RESP_GET, [b"12\r\n"],
+          {"result": "Invalid", "error": "Pump data is not supported"})]
+    )
+    def test_data_received(self, msg_id, msg_type, chunks, expected):
+        """Verify that a response received in several chunks is decoded once."""
+
+        received = []
+        uut = SerialProtocol(None, None, _resp_message=received.append)
+        uut.set_last_message(SentMessage(msg_id, msg_type))
+        for chunk in chunks:
+            uut.data_received(chunk)
+        assert len(received) == 1
+        assert received[0].data == expected